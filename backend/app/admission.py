@@ -0,0 +1,136 @@
+"""Admission control for the chat endpoints.
+
+Each admitted request holds one of max_in_flight slots until its response
+has been fully sent, streaming included. When every slot is busy, up to
+max_queue requests wait, each for at most queue_timeout seconds. Past that
+the request gets an immediate 503. Per-client token buckets can also cap
+each caller's request rate (429). Both rejections carry Retry-After. They
+cost a few dictionary operations, so an overloaded worker keeps serving the
+requests it has accepted at a steady latency instead of timing all of them
+out.
+"""
+import asyncio
+import json
+import math
+import os
+import time
+from collections import OrderedDict
+
+from .metrics import ADMISSION_QUEUED, ADMISSION_REJECTIONS
+
+ADMISSION_PATHS = ("/chat", "/chat/stream", "/chat/batch")
+
+
+class TokenBuckets:
+    """Per-client token buckets refilled at rate tokens per second up to burst."""
+
+    def __init__(self, rate, burst, max_clients=100000):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+
+    def take(self, client, now=None):
+        """Spend one token; return 0 if allowed, else seconds until a token is available."""
+        now = time.monotonic() if now is None else now
+        tokens, updated = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens >= 1.0:
+            tokens -= 1.0
+        else:
+            wait = (1.0 - tokens) / self.rate
+        # Re-inserted at the end, so the least recently seen clients go first
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that admits, queues or rejects requests to paths."""
+
+    def __init__(self, app, paths=ADMISSION_PATHS, max_in_flight=None, max_queue=None,
+                 queue_timeout=None, rate=None, burst=None, client_header=None):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_in_flight = max_in_flight or int(os.getenv("ADMISSION_MAX_IN_FLIGHT", "256"))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("ADMISSION_MAX_QUEUE", "256"))
+        self.queue_timeout = queue_timeout if queue_timeout is not None else float(
+            os.getenv("ADMISSION_QUEUE_TIMEOUT", "2.0"))
+        rate = rate if rate is not None else float(os.getenv("ADMISSION_RATE", "0"))
+        burst = burst if burst is not None else float(os.getenv("ADMISSION_BURST", "10"))
+        self.buckets = TokenBuckets(rate, burst) if rate > 0 else None
+        # e.g. "x-forwarded-for" behind a proxy; the socket address otherwise
+        header = client_header or os.getenv("ADMISSION_CLIENT_HEADER", "")
+        self.client_header = header.lower().encode("latin-1") or None
+
+        self.in_flight = 0
+        self.queued = 0
+        self._slots = None
+
+    def _client(self, scope):
+        if self.client_header is not None:
+            for name, value in scope["headers"]:
+                if name == self.client_header:
+                    return value.decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        if self._slots is None:
+            # Created on first use so it binds to the server's event loop
+            self._slots = asyncio.Semaphore(self.max_in_flight)
+
+        if self.buckets is not None:
+            wait = self.buckets.take(self._client(scope))
+            if wait > 0:
+                await self._reject(scope, send, 429, "rate_limited", wait)
+                return
+
+        if self._slots.locked():
+            if self.queued >= self.max_queue:
+                await self._reject(scope, send, 503, "queue_full", self.queue_timeout)
+                return
+            self.queued += 1
+            ADMISSION_QUEUED.inc()
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                await self._reject(scope, send, 503, "queue_timeout", self.queue_timeout)
+                return
+            finally:
+                self.queued -= 1
+                ADMISSION_QUEUED.dec()
+        else:
+            await self._slots.acquire()
+
+        self.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def _reject(self, scope, send, status, reason, retry_after):
+        ADMISSION_REJECTIONS.labels(reason).inc()
+        # The router never runs, so label the request metrics with the path
+        scope["route_path"] = scope["path"]
+        detail = "Too many requests" if status == 429 else "Server is overloaded"
+        body = json.dumps({"detail": detail}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode("latin-1")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def stats(self):
+        return {"in_flight": self.in_flight, "queued": self.queued}
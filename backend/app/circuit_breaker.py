@@ -0,0 +1,130 @@
+import os
+import threading
+import time
+from collections import deque
+
+from .metrics import LLM_CIRCUIT_OPEN, LLM_CIRCUIT_TRIPS
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class Permit:
+    """Handed out by allow(); identifies which state of the circuit a call belongs to."""
+
+    __slots__ = ("generation",)
+
+    def __init__(self, generation):
+        self.generation = generation
+
+
+class CircuitBreaker:
+    """Stops calling a dependency that is failing or too slow.
+
+    The outcomes of the last window calls are kept; a call counts as bad if
+    it failed or took at least slow_call_seconds. Once min_calls outcomes
+    are known and the bad share reaches failure_rate, the circuit opens and
+    allow() refuses calls for open_seconds. After that a single probe call
+    is let through (half open): success closes the circuit, failure opens
+    it again.
+
+    Every state change starts a new generation, and results are only
+    counted for permits of the current one. Calls that were already in
+    flight when the circuit opened therefore cannot trip it again or
+    restart the timer, and a late success cannot close a half-open circuit
+    in place of the probe.
+    """
+
+    def __init__(self, failure_rate=0.5, slow_call_seconds=5.0, window=20, min_calls=10,
+                 open_seconds=30.0, clock=time.monotonic):
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.clock = clock
+        self.state = CLOSED
+        self.trips = 0
+        self._outcomes = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._generation = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Return a Permit if a call may go ahead now, else None."""
+        with self._lock:
+            if self.state == OPEN:
+                if self.clock() - self._opened_at < self.open_seconds:
+                    return None
+                self._set_state(HALF_OPEN)
+            if self.state == HALF_OPEN:
+                if self._probing:
+                    return None
+                self._probing = True
+            return Permit(self._generation)
+
+    def record(self, permit, ok, seconds=0.0):
+        """Record the outcome of a call that allow() let through."""
+        bad = not ok or seconds >= self.slow_call_seconds
+        with self._lock:
+            if permit.generation != self._generation:
+                return
+            if self.state == HALF_OPEN:
+                if bad:
+                    self._trip()
+                else:
+                    self._set_state(CLOSED)
+                return
+            self._outcomes.append(bad)
+            if (len(self._outcomes) >= self.min_calls
+                    and sum(self._outcomes) >= self.failure_rate * len(self._outcomes)):
+                self._trip()
+
+    def release(self, permit, seconds=0.0):
+        """Give back a permit whose call was abandoned without an outcome.
+
+        A call abandoned after at least slow_call_seconds, typically by the
+        chat deadline, was slow whatever it would have returned, so it is
+        recorded as a bad call instead.
+        """
+        if seconds >= self.slow_call_seconds:
+            self.record(permit, False, seconds)
+            return
+        with self._lock:
+            if permit.generation == self._generation and self.state == HALF_OPEN:
+                self._probing = False
+
+    def retry_after(self):
+        """Seconds until the next probe is allowed; 0 unless open."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.open_seconds - (self.clock() - self._opened_at))
+
+    def _set_state(self, state):
+        self.state = state
+        self._generation += 1
+        self._outcomes.clear()
+        self._probing = False
+        LLM_CIRCUIT_OPEN.set(1 if state == OPEN else 0)
+
+    def _trip(self):
+        self._set_state(OPEN)
+        self._opened_at = self.clock()
+        self.trips += 1
+        LLM_CIRCUIT_TRIPS.inc()
+
+    def stats(self):
+        return {"state": self.state, "trips": self.trips, "retry_after": self.retry_after()}
+
+
+def circuit_breaker_from_env():
+    if os.getenv("LLM_BREAKER_ENABLED", "true").lower() != "true":
+        return None
+    return CircuitBreaker(
+        failure_rate=float(os.getenv("LLM_BREAKER_FAILURE_RATE", "0.5")),
+        slow_call_seconds=float(os.getenv("LLM_SLOW_CALL_SECONDS", "5")),
+        window=int(os.getenv("LLM_BREAKER_WINDOW", "20")),
+        min_calls=int(os.getenv("LLM_BREAKER_MIN_CALLS", "10")),
+        open_seconds=float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30")),
+    )
@@ -0,0 +1,170 @@
+import datetime
+import logging
+import queue
+import threading
+import time
+
+from .metrics import DB_FLUSH_SECONDS, DB_QUEUE_DEPTH, DB_ROWS
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class ConversationWriter:
+    """Write-behind queue that persists Conversation rows in batches.
+
+    Request handlers call submit(), which only enqueues the row. A background
+    thread groups queued rows into one transaction per batch, flushing when
+    batch_size rows are waiting or flush_interval seconds have passed.
+
+    Without an explicit session_factory the writer thread imports the
+    database module and creates the tables itself, which keeps SQLAlchemy
+    off the startup path.
+    """
+
+    def __init__(self, session_factory=None, batch_size=100,
+                 flush_interval=0.5, max_queue_size=10000):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        # write_batch() flushes from request threads alongside the writer thread
+        self._stats_lock = threading.Lock()
+
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.batches_flushed = 0
+        self.last_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="conversation-writer", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, user_input, bot_response, **fields):
+        """Queue a conversation row for persistence without blocking."""
+        self.start()
+        row = {"user_input": user_input, "bot_response": bot_response, **fields}
+        row.setdefault("timestamp", datetime.datetime.utcnow())
+        try:
+            self._queue.put_nowait(row)
+            DB_QUEUE_DEPTH.inc()
+        except queue.Full:
+            with self._stats_lock:
+                self.rows_dropped += 1
+            DB_ROWS.labels("dropped").inc()
+            logger.error("Conversation write queue full, dropping row")
+
+    def write_batch(self, rows):
+        """Insert rows now, in one transaction, bypassing the queue.
+
+        Blocks until the commit; returns False if it failed (the error is
+        logged). Used for bulk requests that already hold all their rows.
+        """
+        self._ensure_session_factory()
+        now = datetime.datetime.utcnow()
+        return self._flush([{"timestamp": now, **row} for row in rows])
+
+    def stop(self, timeout=10.0):
+        """Flush everything still queued and stop the background thread."""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "queue_depth": self.depth,
+                "rows_written": self.rows_written,
+                "rows_dropped": self.rows_dropped,
+                "batches_flushed": self.batches_flushed,
+                "last_flush_seconds": self.last_flush_seconds,
+                "max_flush_seconds": self.max_flush_seconds,
+            }
+
+    def _ensure_session_factory(self):
+        if self.session_factory is None:
+            from .database import WriteSessionLocal, init_db
+            try:
+                init_db()
+            except Exception as e:
+                logger.error(f"Failed to initialize conversation database: {str(e)}")
+            self.session_factory = WriteSessionLocal
+
+    def _run(self):
+        self._ensure_session_factory()
+
+        stopping = False
+        while not stopping:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            if stopping:
+                # Drain whatever arrived before the stop marker
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is not _STOP:
+                        batch.append(item)
+
+            DB_QUEUE_DEPTH.dec(len(batch))
+            for start in range(0, len(batch), self.batch_size):
+                self._flush(batch[start:start + self.batch_size])
+
+    def _flush(self, rows):
+        if not rows:
+            return True
+        from sqlalchemy import insert
+        from .database import Conversation
+
+        started = time.perf_counter()
+        db = self.session_factory()
+        try:
+            db.execute(insert(Conversation), rows)
+            db.commit()
+            written = True
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to flush {len(rows)} conversation rows: {str(e)}")
+            written = False
+        finally:
+            db.close()
+        elapsed = time.perf_counter() - started
+        with self._stats_lock:
+            if written:
+                self.rows_written += len(rows)
+            else:
+                self.rows_dropped += len(rows)
+            self.batches_flushed += 1
+            self.last_flush_seconds = elapsed
+            self.max_flush_seconds = max(self.max_flush_seconds, elapsed)
+        DB_ROWS.labels("written" if written else "dropped").inc(len(rows))
+        DB_FLUSH_SECONDS.observe(elapsed)
+        return written
@@ -1,21 +1,137 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime
+from sqlalchemy import create_engine, event, inspect, bindparam, select, text, update, Column, Index, Integer, BigInteger, String, DateTime
 from sqlalchemy.orm import sessionmaker, declarative_base
 import datetime
+import hashlib
+import os
 
-DATABASE_URL = "sqlite:///./chatbot.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./chatbot.db")
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+def _engine_options(url):
+    if not url.startswith("sqlite"):
+        return {"pool_pre_ping": True}
+    options = {"connect_args": {"check_same_thread": False}}
+    if url not in ("sqlite://", "sqlite:///:memory:"):
+        # File databases get a real pool so threads reuse connections
+        options.update(
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        )
+    return options
+
+def configure_sqlite(engine):
+    """Install the connection pragmas and transaction handling on a SQLite engine."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers proceed during writes; NORMAL only fsyncs at checkpoints
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KB', '65536'))}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute(f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}")
+        cursor.close()
+        # Let SQLAlchemy emit BEGIN itself (below) instead of pysqlite's implicit one
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin(connection):
+        mode = connection.get_execution_options().get("sqlite_begin", "DEFERRED")
+        connection.exec_driver_sql(f"BEGIN {mode}")
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+configure_sqlite(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Sessions that write take SQLite's write lock when they begin. Several
+# worker processes share the file, and a deferred transaction that later
+# upgrades to a write can fail with "database is locked" without waiting
+# out busy_timeout; BEGIN IMMEDIATE waits for the lock instead.
+write_engine = engine.execution_options(sqlite_begin="IMMEDIATE")
+WriteSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=write_engine)
+
+def content_hash(value):
+    """Return a signed 64-bit hash of value for compact equality lookups."""
+    digest = hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+def _user_input_hash(context):
+    user_input = context.get_current_parameters().get("user_input")
+    return content_hash(user_input) if user_input is not None else None
+
 Base = declarative_base()
 
 class Conversation(Base):
     __tablename__ = "conversations"
 
-    id = Column(Integer, primary_key=True, index=True)
-    user_input = Column(String, index=True)
+    id = Column(Integer, primary_key=True)
+    user_input = Column(String)
+    # Indexed 8-byte hash instead of a B-tree over the unbounded text
+    user_input_hash = Column(BigInteger, index=True, default=_user_input_hash)
     bot_response = Column(String)
     timestamp = Column(DateTime, default=datetime.datetime.utcnow)
+    session_id = Column(String(64))
+    user_id = Column(String(64))
+
+    # Keyset pagination walks (timestamp, id) newest first, optionally per session/user
+    __table_args__ = (
+        Index("ix_conversations_timestamp_id", "timestamp", "id"),
+        Index("ix_conversations_session_timestamp_id", "session_id", "timestamp", "id"),
+        Index("ix_conversations_user_timestamp_id", "user_id", "timestamp", "id"),
+    )
+
+def find_conversations_by_input(db, user_input, limit=100):
+    """Look up conversations whose user_input equals the given text."""
+    return db.scalars(
+        select(Conversation)
+        .where(Conversation.user_input_hash == content_hash(user_input))
+        .where(Conversation.user_input == user_input)
+        .order_by(Conversation.id.desc())
+        .limit(limit)
+    ).all()
+
+def _migrate(connection):
+    # Databases created before user_input_hash existed: add it, backfill it
+    # and drop the old index on the raw text column
+    columns = {column["name"] for column in inspect(connection).get_columns("conversations")}
+    for name in ("session_id", "user_id"):
+        if name not in columns:
+            connection.execute(text(f"ALTER TABLE conversations ADD COLUMN {name} VARCHAR(64)"))
+    if "user_input_hash" not in columns:
+        connection.execute(text("ALTER TABLE conversations ADD COLUMN user_input_hash BIGINT"))
+        table = Conversation.__table__
+        backfill = update(table).where(table.c.id == bindparam("row_id"))
+        last_id = 0
+        while True:
+            rows = connection.execute(
+                select(table.c.id, table.c.user_input)
+                .where(table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(10000)
+            ).all()
+            if not rows:
+                break
+            connection.execute(backfill, [
+                {"row_id": row_id, "user_input_hash": content_hash(value) if value is not None else None}
+                for row_id, value in rows
+            ])
+            last_id = rows[-1][0]
+    connection.execute(text("DROP INDEX IF EXISTS ix_conversations_user_input"))
+    connection.execute(text("DROP INDEX IF EXISTS ix_conversations_id"))
+    for index in Conversation.__table__.indexes:
+        index.create(connection, checkfirst=True)
+
+_initialized = False
 
-# Create tables
-Base.metadata.create_all(bind=engine)
+def init_db():
+    """Create tables on first use instead of at import time."""
+    global _initialized
+    if not _initialized:
+        # One transaction holding the write lock, so workers starting
+        # together create and migrate the schema one at a time
+        with engine.execution_options(sqlite_begin="IMMEDIATE").begin() as connection:
+            Base.metadata.create_all(bind=connection)
+            _migrate(connection)
+        _initialized = True
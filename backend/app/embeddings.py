@@ -0,0 +1,238 @@
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import httpx
+import numpy as np
+
+from .llm_client import DEFAULT_BASE_URL
+from .model import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=262144)
+def _feature_hash(feature):
+    # Stable across processes, unlike hash(); cached since words repeat a lot
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HashingEmbedder:
+    """Offline embedder hashing word unigrams and bigrams into dim buckets.
+
+    Needs no vocabulary or fitting, so the same text always maps to the same
+    vector and embeddings stay valid as the corpus grows. Bucket signs come
+    from the hash as well, which keeps collisions from only adding up.
+    """
+
+    def __init__(self, dim=1024):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text):
+        tokens = _TOKEN_RE.findall(text.lower())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for feature in self._features(text):
+                digest = _feature_hash(feature)
+                column = digest % self.dim
+                sign = 1.0 if digest >> 63 else -1.0
+                counts[column] = counts.get(column, 0.0) + sign
+            if counts:
+                columns = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+                values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+                # Sublinear term frequency so repeated words don't dominate
+                vectors[row, columns] = np.sign(values) * np.log1p(np.abs(values))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+
+class OpenAIEmbedder:
+    """Embedder calling the OpenAI-compatible /embeddings endpoint over a pooled client."""
+
+    def __init__(self, model=DEFAULT_EMBEDDING_MODEL, api_key=None, base_url=None,
+                 timeout=None, transport=None):
+        self.model = model
+        self.name = f"openai-{model}"
+        base_url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self._http = httpx.Client(
+            base_url=base_url,
+            headers={"Authorization": f"Bearer {api_key or os.getenv('OPENAI_API_KEY', '')}"},
+            timeout=timeout or float(os.getenv("LLM_TIMEOUT", "30")),
+            transport=transport,
+        )
+
+    def embed(self, texts):
+        response = self._http.post("/embeddings", json={"model": self.model, "input": list(texts)})
+        response.raise_for_status()
+        data = sorted(response.json()["data"], key=lambda item: item["index"])
+        return np.asarray([item["embedding"] for item in data], dtype=np.float32)
+
+    def close(self):
+        self._http.close()
+
+
+class EmbeddingCache:
+    """SQLite table of embeddings keyed by embedder name and chunk text hash."""
+
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for key, blob in self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", chunk
+                ):
+                    found[key] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    def set_many(self, items):
+        created_at = time.time()
+        rows = [(key, np.asarray(vector, dtype=np.float32).tobytes(), created_at)
+                for key, vector in items]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                    rows,
+                )
+            except Exception:
+                # Leave the connection usable for the next call
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class EmbeddingPipeline:
+    """Embed chunks once: dedupe by hash, reuse cached vectors, batch the rest.
+
+    Identical chunks (within a call or across documents) are embedded once.
+    Vectors already in the cache are reused, and the remaining misses are
+    sent to the embedder in batches of batch_size, up to max_workers
+    batches at a time, each retried with exponential backoff.
+
+    embed_documents and embed_query match LangChain's Embeddings interface,
+    so the pipeline can be passed wherever the Streamlit apps expect one.
+    """
+
+    def __init__(self, embedder, cache=None, batch_size=64, max_workers=4,
+                 retries=3, backoff=0.5):
+        self.embedder = embedder
+        self.cache = cache
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.embedder.name}\0{text}".encode("utf-8")).hexdigest()
+
+    def embed(self, texts):
+        """Return a (len(texts) x dim) float32 matrix in input order."""
+        keys = [self.key(text) for text in texts]
+        unique = dict(zip(keys, texts))
+
+        vectors = self.cache.get_many(list(unique)) if self.cache is not None else {}
+        missing = [key for key in unique if key not in vectors]
+        self.hits += len(unique) - len(missing)
+        self.misses += len(missing)
+
+        if missing:
+            batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+            workers = min(self.max_workers, len(batches))
+            if workers > 1:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(
+                        lambda batch: self._embed_batch([unique[key] for key in batch]), batches
+                    ))
+            else:
+                results = [self._embed_batch([unique[key] for key in batch]) for batch in batches]
+
+            self.batches += len(batches)
+            computed = []
+            for batch, batch_vectors in zip(batches, results):
+                computed.extend(zip(batch, batch_vectors))
+            vectors.update(computed)
+            if self.cache is not None:
+                self.cache.set_many(computed)
+
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys]).astype(np.float32, copy=False)
+
+    def _embed_batch(self, texts):
+        for attempt in range(self.retries + 1):
+            try:
+                return self.embedder.embed(texts)
+            except Exception as e:
+                # Client errors other than rate limiting will fail again
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                if attempt == self.retries or (status is not None and status < 500 and status != 429):
+                    raise
+                delay = self.backoff * (2 ** attempt)
+                logger.warning(f"Embedding batch failed ({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def embed_documents(self, texts):
+        return self.embed(texts).tolist()
+
+    def embed_query(self, text):
+        return self.embed([text])[0].tolist()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "batches": self.batches}
+
+
+def embedder_from_env():
+    backend = os.getenv("EMBEDDING_BACKEND", "openai").lower()
+    if backend == "hashing":
+        return HashingEmbedder(dim=int(os.getenv("EMBEDDING_DIM", "1024")))
+    if backend == "openai":
+        return OpenAIEmbedder()
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
+
+
+def embedding_pipeline_from_env():
+    db_path = os.getenv("EMBEDDING_CACHE_DB") or os.path.join(DATA_DIR, "embedding_cache.db")
+    return EmbeddingPipeline(
+        embedder_from_env(),
+        cache=EmbeddingCache(db_path),
+        batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "64")),
+        max_workers=int(os.getenv("EMBEDDING_CONCURRENCY", "4")),
+    )
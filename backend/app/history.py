@@ -0,0 +1,53 @@
+import base64
+import datetime
+import json
+
+from sqlalchemy import select, tuple_
+
+from .database import Conversation
+
+MAX_PAGE_SIZE = 200
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(conversation):
+    payload = json.dumps([conversation.timestamp.isoformat(), conversation.id])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+
+
+def fetch_conversations(db, session_id=None, user_id=None, limit=50, cursor=None, before=None):
+    """Return one page of conversations, newest first, and the next cursor.
+
+    Pages are addressed by the (timestamp, id) of the last row returned, so
+    every page is a bounded index range scan instead of an OFFSET skip.
+    before, a datetime, starts the first page at rows older than it.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = select(Conversation)
+    if session_id is not None:
+        query = query.where(Conversation.session_id == session_id)
+    if user_id is not None:
+        query = query.where(Conversation.user_id == user_id)
+    if before is not None:
+        query = query.where(Conversation.timestamp < before)
+    if cursor is not None:
+        timestamp, row_id = decode_cursor(cursor)
+        # Row-value comparison lets SQLite seek straight to the cursor in the index
+        query = query.where(tuple_(Conversation.timestamp, Conversation.id) < (timestamp, row_id))
+    query = query.order_by(Conversation.timestamp.desc(), Conversation.id.desc()).limit(limit + 1)
+
+    rows = db.scalars(query).all()
+    page = rows[:limit]
+    next_cursor = encode_cursor(page[-1]) if len(rows) > limit else None
+    return page, next_cursor
@@ -0,0 +1,308 @@
+import asyncio
+import json
+import os
+import time
+
+import httpx
+
+from .circuit_breaker import circuit_breaker_from_env
+from .metrics import LLM_IN_FLIGHT, LLM_REQUESTS, LLM_UPSTREAM_SECONDS
+from .response_cache import ResponseCache, response_cache_from_env
+
+DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+
+
+class LLMError(Exception):
+    """Raised when the upstream chat-completion call fails or times out."""
+
+
+class CircuitOpenError(LLMError):
+    """Raised without calling upstream while the circuit breaker is open."""
+
+
+class LLMClient:
+    """Async chat-completion client sharing one keep-alive connection pool.
+
+    All callers in the process go through a single instance so upstream
+    connections are reused, and a semaphore caps how many completions are
+    in flight at once. Answers are looked up in (and stored to) the
+    optional ResponseCache before going upstream.
+
+    With coalesce enabled, a completion requested while an identical one
+    (same normalized conversation, model and temperature) is already in
+    flight waits for that call instead of sending another.
+
+    An optional CircuitBreaker fails calls fast while upstream is erroring
+    or slow. With hedge_after set, a completion still unanswered after that
+    many seconds is sent a second time and the first answer wins.
+    """
+
+    def __init__(self, api_key=None, base_url=None, max_concurrency=None,
+                 timeout=None, max_connections=None, transport=None, cache=None,
+                 coalesce=None, breaker=None, hedge_after=None):
+        self.api_key = api_key or os.getenv("OPENAI_API_KEY", "")
+        self.base_url = (base_url or os.getenv("OPENAI_BASE_URL") or DEFAULT_BASE_URL).rstrip("/")
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "256"))
+        self.timeout = timeout or float(os.getenv("LLM_TIMEOUT", "30"))
+        max_connections = max_connections or int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=30.0,
+            ),
+            timeout=self.timeout,
+            transport=transport,
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight = 0
+        self.cache = cache
+        if coalesce is None:
+            coalesce = os.getenv("LLM_COALESCE", "true").lower() == "true"
+        self.coalesce = coalesce
+        self.coalesced = 0
+        self._pending = {}
+        self.breaker = breaker
+        if hedge_after is None:
+            hedge_after = float(os.getenv("LLM_HEDGE_AFTER", "0"))
+        self.hedge_after = hedge_after
+
+    async def complete(self, messages, model=DEFAULT_MODEL, temperature=None, timeout=None,
+                       use_cache=True):
+        """Return the assistant message content for a chat completion."""
+        key = None
+        if self.coalesce or (use_cache and self.cache is not None):
+            key = ResponseCache.key_for_messages(messages, model, temperature)
+        cache_key = key if use_cache and self.cache is not None else None
+        if cache_key is not None:
+            cached = await self.cache.aget(cache_key)
+            if cached is not None:
+                LLM_REQUESTS.labels("cache_hit").inc()
+                return cached
+
+        if not self.coalesce or key is None:
+            return await self._complete(messages, model, temperature, timeout, cache_key)
+
+        call = self._pending.get(key)
+        if call is None:
+            # The call runs as its own task, so a leader that is cancelled
+            # (say, a client disconnect) does not fail the followers
+            call = asyncio.ensure_future(
+                self._complete(messages, model, temperature, timeout, cache_key)
+            )
+            self._pending[key] = call
+            call.add_done_callback(lambda done: self._call_finished(key, done))
+        else:
+            self.coalesced += 1
+            LLM_REQUESTS.labels("coalesced").inc()
+        return await asyncio.shield(call)
+
+    def _call_finished(self, key, call):
+        if self._pending.get(key) is call:
+            del self._pending[key]
+        # Mark the error retrieved even if every waiter was cancelled
+        if not call.cancelled():
+            call.exception()
+
+    def _check_breaker(self):
+        """Return the breaker's permit for one upstream call (None without a breaker)."""
+        if self.breaker is None:
+            return None
+        permit = self.breaker.allow()
+        if permit is None:
+            LLM_REQUESTS.labels("circuit_open").inc()
+            raise CircuitOpenError(
+                f"Upstream circuit open; retry in {self.breaker.retry_after():.0f}s"
+            )
+        return permit
+
+    def _record(self, permit, ok, seconds):
+        if self.breaker is not None:
+            self.breaker.record(permit, ok, seconds)
+
+    def _release(self, permit, seconds):
+        if self.breaker is not None:
+            self.breaker.release(permit, seconds)
+
+    async def _complete(self, messages, model, temperature, timeout, cache_key):
+        payload = {"model": model, "messages": messages}
+        if temperature is not None:
+            payload["temperature"] = temperature
+        timeout = timeout or self.timeout
+
+        permit = self._check_breaker()
+        started = time.perf_counter()
+        try:
+            if self.hedge_after:
+                content = await self._hedged(payload, timeout)
+            else:
+                content = await self._attempt(payload, timeout)
+        except LLMError:
+            self._record(permit, False, time.perf_counter() - started)
+            raise
+        except asyncio.CancelledError:
+            # Usually the chat deadline; counts as a slow call if it ran long enough
+            self._release(permit, time.perf_counter() - started)
+            raise
+        self._record(permit, True, time.perf_counter() - started)
+
+        if cache_key is not None:
+            await self.cache.aset(cache_key, content)
+        return content
+
+    async def _hedged(self, payload, timeout):
+        attempts = {asyncio.ensure_future(self._attempt(payload, timeout))}
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=self.hedge_after)
+            if not done:
+                LLM_REQUESTS.labels("hedge").inc()
+                attempts.add(asyncio.ensure_future(self._attempt(payload, timeout)))
+            error = None
+            while attempts:
+                done, attempts = await asyncio.wait(attempts, return_when=asyncio.FIRST_COMPLETED)
+                for attempt in done:
+                    if attempt.exception() is None:
+                        return attempt.result()
+                    error = attempt.exception()
+            raise error
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+
+    async def _attempt(self, payload, timeout):
+        async with self._semaphore:
+            self.in_flight += 1
+            LLM_IN_FLIGHT.inc()
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    self._http.post("/chat/completions", json=payload), timeout
+                )
+                response.raise_for_status()
+            except asyncio.TimeoutError as e:
+                LLM_REQUESTS.labels("timeout").inc()
+                raise LLMError(f"Upstream completion timed out after {timeout}s") from e
+            except httpx.HTTPError as e:
+                LLM_REQUESTS.labels("error").inc()
+                raise LLMError(f"Upstream completion failed: {e}") from e
+            finally:
+                self.in_flight -= 1
+                LLM_IN_FLIGHT.dec()
+                LLM_UPSTREAM_SECONDS.labels("complete").observe(time.perf_counter() - started)
+
+        try:
+            content = response.json()["choices"][0]["message"]["content"]
+        except (ValueError, KeyError, IndexError) as e:
+            LLM_REQUESTS.labels("error").inc()
+            raise LLMError("Malformed upstream completion response") from e
+        LLM_REQUESTS.labels("ok").inc()
+        return content
+
+    async def stream(self, messages, model=DEFAULT_MODEL, temperature=None, timeout=None,
+                     use_cache=True):
+        """Yield content deltas as the upstream model produces them.
+
+        timeout bounds the wait for each chunk rather than the whole answer.
+        A cached answer is yielded as a single chunk; a completed stream is
+        stored in the cache.
+        """
+        cache_key = None
+        if use_cache and self.cache is not None:
+            cache_key = ResponseCache.key_for_messages(messages, model, temperature)
+            if cache_key is not None:
+                cached = await self.cache.aget(cache_key)
+                if cached is not None:
+                    LLM_REQUESTS.labels("cache_hit").inc()
+                    yield cached
+                    return
+
+        payload = {"model": model, "messages": messages, "stream": True}
+        if temperature is not None:
+            payload["temperature"] = temperature
+        timeout = timeout or self.timeout
+        parts = []
+
+        # Long answers take long to stream, so the breaker judges the
+        # latency of a stream by its first chunk
+        permit = self._check_breaker()
+        started = time.perf_counter()
+        first_chunk = None
+        try:
+            async for delta in self._stream_attempt(payload, timeout, parts):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - started
+                yield delta
+        except LLMError:
+            self._record(permit, False, time.perf_counter() - started)
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            self._release(permit, first_chunk if first_chunk is not None else time.perf_counter() - started)
+            raise
+        self._record(permit, True, first_chunk if first_chunk is not None else time.perf_counter() - started)
+
+        if cache_key is not None:
+            await self.cache.aset(cache_key, "".join(parts))
+
+    async def _stream_attempt(self, payload, timeout, parts):
+        async with self._semaphore:
+            self.in_flight += 1
+            LLM_IN_FLIGHT.inc()
+            started = time.perf_counter()
+            try:
+                async with self._http.stream(
+                    "POST", "/chat/completions", json=payload, timeout=timeout
+                ) as response:
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            delta = json.loads(data)["choices"][0]["delta"].get("content")
+                        except (ValueError, KeyError, IndexError) as e:
+                            LLM_REQUESTS.labels("error").inc()
+                            raise LLMError("Malformed upstream stream chunk") from e
+                        if delta:
+                            parts.append(delta)
+                            yield delta
+            except httpx.TimeoutException as e:
+                LLM_REQUESTS.labels("timeout").inc()
+                raise LLMError(f"Upstream stream stalled for more than {timeout}s") from e
+            except httpx.HTTPError as e:
+                LLM_REQUESTS.labels("error").inc()
+                raise LLMError(f"Upstream stream failed: {e}") from e
+            finally:
+                self.in_flight -= 1
+                LLM_IN_FLIGHT.dec()
+                LLM_UPSTREAM_SECONDS.labels("stream").observe(time.perf_counter() - started)
+
+        LLM_REQUESTS.labels("ok").inc()
+
+    async def aclose(self):
+        await self._http.aclose()
+
+
+_client = None
+
+
+def get_llm_client():
+    """Return the process-wide LLMClient, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = LLMClient(cache=response_cache_from_env(), breaker=circuit_breaker_from_env())
+    return _client
+
+
+async def close_llm_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        if _client.cache is not None:
+            _client.cache.close()
+        _client = None
@@ -1,17 +1,120 @@
+import time
+
+_import_started = time.perf_counter()
+
+import asyncio
+import gc
+import json
+import logging
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Optional
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from .model.chatbot_engine import ChatbotEngine
-from .database import SessionLocal, Conversation
-from sqlalchemy.orm import Session
-import logging
-import os
+from .admission import AdmissionMiddleware
+from .conversation_writer import ConversationWriter
+from .llm_client import get_llm_client, close_llm_client
+from .metrics import CONTENT_TYPE, MetricsMiddleware, render_metrics, stage
+from .training import TrainingJobManager
 from dotenv import load_dotenv
-import openai
 
 load_dotenv()
 
-app = FastAPI(title="AI Chatbot Assistant", version="1.0.0")
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Largest list /chat/batch accepts in one request
+CHAT_BATCH_MAX_SIZE = int(os.getenv("CHAT_BATCH_MAX_SIZE", "1000"))
+
+# Upper bound for the epochs a /train request may ask for
+TRAIN_MAX_EPOCHS = int(os.getenv("TRAIN_MAX_EPOCHS", "2000"))
+
+# Seconds a worker may take from import to ready before we log a warning
+COLD_START_BUDGET = float(os.getenv("COLD_START_BUDGET", "1.0"))
+
+# The engine is built by the lifespan hook (or on first use), not at import
+chatbot = None
+
+def get_chatbot():
+    global chatbot
+    if chatbot is None:
+        chatbot = ChatbotEngine()
+    return chatbot
+
+def preload():
+    """Build and warm the engine in a parent process that is about to fork.
+
+    gunicorn.conf.py calls this in the master before workers are spawned.
+    Intents, the compiled matcher, classifier weights and the knowledge base
+    are then shared copy-on-write by every worker. Freezing the collector
+    keeps their cycle-detection passes from touching, and so copying, those
+    pages. Nothing here opens sockets, threads or database connections.
+    """
+    get_chatbot().warm_up()
+    gc.collect()
+    gc.freeze()
+
+# Conversations are persisted in batches off the request path
+conversation_writer = ConversationWriter()
+
+# Training runs in a separate process; finished models are hot-swapped in
+training_jobs = TrainingJobManager(
+    on_complete=lambda job: get_chatbot().reload_classifier(job["model_dir"])
+)
+
+# Seconds /conversations waits for the schema on a worker that just started
+SCHEMA_READY_TIMEOUT = 10.0
+
+# Set once the conversations schema exists; the lifespan hook creates it
+schema_ready = threading.Event()
+
+def init_schema():
+    from .database import init_db
+    try:
+        init_db()
+    except Exception as e:
+        logger.error(f"Failed to initialize conversation database: {str(e)}")
+        return
+    schema_ready.set()
+
+@asynccontextmanager
+async def lifespan(app):
+    app.state.ready = False
+    started = time.perf_counter()
+    get_chatbot()
+    conversation_writer.start()
+    app.state.startup_seconds = _import_seconds + (time.perf_counter() - started)
+    app.state.ready = True
+    logger.info(f"Backend ready in {app.state.startup_seconds:.3f}s")
+    if app.state.startup_seconds > COLD_START_BUDGET:
+        logger.warning(
+            f"Cold start took {app.state.startup_seconds:.3f}s, over the {COLD_START_BUDGET}s budget"
+        )
+
+    # One-off costs such as importing the tokenizer or SQLAlchemy happen
+    # after we report ready
+    warm_up = asyncio.create_task(asyncio.to_thread(get_chatbot().warm_up))
+    schema = asyncio.create_task(asyncio.to_thread(init_schema))
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        warm_up.cancel()
+        schema.cancel()
+        conversation_writer.stop()
+        training_jobs.shutdown()
+        await close_llm_client()
+
+app = FastAPI(title="AI Chatbot Assistant", version="1.0.0", lifespan=lifespan)
+
+# Bounds the chat requests in flight and rate-limits clients before any
+# work; inside CORS so browsers can read the 429/503 rejections
+app.add_middleware(AdmissionMiddleware)
 
 # Add CORS middleware
 app.add_middleware(
@@ -22,57 +125,191 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize chatbot engine
-chatbot = ChatbotEngine()
+# Outermost, so the request timing includes CORS handling and rejections
+app.add_middleware(MetricsMiddleware)
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Set OpenAI API key
-openai.api_key = os.getenv("sk-abcd1234abcd1234abcd1234abcd1234abcd1234")
 class ChatRequest(BaseModel):
     user_message: str
+    session_id: Optional[str] = None
+    user_id: Optional[str] = None
+
+class ChatBatchRequest(BaseModel):
+    messages: List[ChatRequest]
 
 class TrainRequest(BaseModel):
-    pass  # For future training data
+    epochs: int = Field(200, ge=1, le=TRAIN_MAX_EPOCHS)
 
 @app.post("/chat")
 async def chat_endpoint(request: ChatRequest):
     try:
         logger.info(f"Received chat request: {request.user_message}")
-        # Use OpenAI for response
-        openai_response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a helpful AI assistant."},
-                {"role": "user", "content": request.user_message}
-            ]
-        )
-        response = openai_response.choices[0].message.content
+        # Local tiers first, then the LLM under a deadline; upstream
+        # failures degrade to local answers instead of an error
+        response, degraded = await get_chatbot().respond(request.user_message, request.session_id)
 
-        # Save to database
-        db: Session = SessionLocal()
-        conversation = Conversation(user_input=request.user_message, bot_response=response)
-        db.add(conversation)
-        db.commit()
-        db.close()
+        # Queue for the write-behind batch insert
+        with stage("persist"):
+            conversation_writer.submit(
+                request.user_message, response,
+                session_id=request.session_id, user_id=request.user_id,
+            )
 
-        return {"bot_response": response}
+        return {"bot_response": response, "degraded": degraded}
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@app.post("/chat/batch")
+async def chat_batch_endpoint(request: ChatBatchRequest):
+    """Answer many independent messages and return the results in order.
+
+    Intents are classified in one pass, only the misses go upstream with
+    bounded concurrency, and every row is written in a single transaction.
+    """
+    if len(request.messages) > CHAT_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=413, detail=f"At most {CHAT_BATCH_MAX_SIZE} messages per batch"
+        )
+    try:
+        results = await get_chatbot().respond_many([item.user_message for item in request.messages])
+        rows = [
+            {"user_input": item.user_message, "bot_response": response,
+             "session_id": item.session_id, "user_id": item.user_id}
+            for item, (response, _) in zip(request.messages, results)
+        ]
+        with stage("persist"):
+            persisted = await asyncio.to_thread(conversation_writer.write_batch, rows)
+    except Exception as e:
+        logger.error(f"Error in chat batch endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    return {
+        "results": [
+            {"bot_response": response, "degraded": degraded} for response, degraded in results
+        ],
+        "persisted": persisted,
+    }
+
+@app.post("/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """Stream the reply as Server-Sent Events.
+
+    Each event carries {"token": ...}; the stream ends with {"done": true}
+    or {"error": ...}. The conversation is persisted only once the whole
+    reply has been delivered.
+    """
+    logger.info(f"Received streaming chat request: {request.user_message}")
+
+    async def event_stream():
+        parts = []
+        try:
+            async for chunk in get_chatbot().stream_response(
+                request.user_message, request.session_id
+            ):
+                parts.append(chunk)
+                yield f"data: {json.dumps({'token': chunk})}\n\n"
+        except Exception as e:
+            logger.error(f"Error in chat stream: {str(e)}")
+            yield f"data: {json.dumps({'error': 'Internal server error'})}\n\n"
+            return
+        with stage("persist"):
+            conversation_writer.submit(
+                request.user_message, "".join(parts),
+                session_id=request.session_id, user_id=request.user_id,
+            )
+        yield f"data: {json.dumps({'done': True})}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/conversations")
+def conversations_endpoint(session_id: Optional[str] = None, user_id: Optional[str] = None,
+                           limit: int = 50, cursor: Optional[str] = None):
+    """Page through stored conversations, newest first.
+
+    At least one of session_id and user_id is required, so every query
+    uses one of the filtered indexes. Pass the returned next_cursor back as
+    cursor to get the following page. Declared sync so FastAPI runs the
+    query in its threadpool.
+    """
+    if session_id is None and user_id is None:
+        raise HTTPException(status_code=400, detail="Pass session_id or user_id")
+    if not schema_ready.wait(SCHEMA_READY_TIMEOUT):
+        raise HTTPException(status_code=503, detail="Conversation database is not ready")
+
+    from .database import SessionLocal
+    from .history import InvalidCursor, fetch_conversations
+
+    with SessionLocal() as db:
+        try:
+            page, next_cursor = fetch_conversations(db, session_id, user_id, limit, cursor)
+        except InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        items = [
+            {
+                "id": conversation.id,
+                "session_id": conversation.session_id,
+                "user_id": conversation.user_id,
+                "user_input": conversation.user_input,
+                "bot_response": conversation.bot_response,
+                "timestamp": conversation.timestamp.isoformat(),
+            }
+            for conversation in page
+        ]
+    return {"items": items, "next_cursor": next_cursor}
+
 @app.post("/train")
-async def train_endpoint(request: TrainRequest):
+async def train_endpoint(request: Optional[TrainRequest] = None):
+    if not training_jobs.available():
+        raise HTTPException(
+            status_code=503,
+            detail="Training is not available on this server; install requirements-train.txt",
+        )
     try:
-        logger.info("Starting model training")
-        # Implement training logic here
-        return {"message": "Training completed"}
+        epochs = request.epochs if request is not None else TrainRequest().epochs
+        job_id = training_jobs.start(epochs=epochs)
+        logger.info(f"Started training job {job_id}")
+        return {"message": "Training started", "job_id": job_id, "status": "queued"}
     except Exception as e:
         logger.error(f"Error in train endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail="Training failed")
 
+@app.get("/train/{job_id}")
+async def train_status_endpoint(job_id: str):
+    status = training_jobs.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return status
+
 @app.get("/health")
 async def health_endpoint():
     return {"status": "healthy"}
+
+@app.get("/ready")
+async def ready_endpoint():
+    # Readiness is separate from /health: a live worker may still be starting
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return {"status": "ready", "startup_seconds": app.state.startup_seconds}
+
+@app.get("/stats")
+async def stats_endpoint():
+    client = get_llm_client()
+    cache = client.cache
+    return {
+        "conversation_writer": conversation_writer.stats(),
+        "response_cache": cache.stats() if cache is not None else None,
+        "memory": get_chatbot().memory.stats(),
+        "circuit_breaker": client.breaker.stats() if client.breaker is not None else None,
+    }
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    """Prometheus scrape endpoint."""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+# Time spent importing this module, counted towards the cold-start budget
+_import_seconds = time.perf_counter() - _import_started
@@ -0,0 +1,196 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+MEMORY_TOKEN_BUDGET = int(os.getenv("MEMORY_TOKEN_BUDGET", "1500"))
+MEMORY_SUMMARY_TOKENS = int(os.getenv("MEMORY_SUMMARY_TOKENS", "300"))
+MEMORY_MAX_SESSIONS = int(os.getenv("MEMORY_MAX_SESSIONS", "10000"))
+
+SUMMARY_PROMPT = (
+    "You keep notes on a conversation between a user and an assistant. "
+    "Merge the earlier summary and the new turns into one updated summary. "
+    "Keep names, facts, preferences, decisions and open questions; drop "
+    "greetings and filler. Write at most {words} words of plain prose."
+)
+
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token for English)."""
+    return len(text) // 4 + 1
+
+
+class _Session:
+    __slots__ = ("summary", "summary_tokens", "turns", "compaction")
+
+    def __init__(self):
+        self.summary = ""
+        self.summary_tokens = 0
+        self.turns = []
+        self.compaction = None
+
+    def history_tokens(self):
+        return self.summary_tokens + sum(tokens for _, _, tokens in self.turns)
+
+
+class ConversationMemory:
+    """Per-session chat history kept within a fixed prompt token budget.
+
+    Recent turns are sent verbatim. Once a session's history grows past
+    budget_tokens, its oldest turns are folded into a running summary by a
+    background task, so the turn that crossed the budget does not wait for
+    it. Each compaction only summarizes the previous summary plus the turns
+    being retired, never the whole conversation. While one is running,
+    prompts drop the oldest turns that do not fit, so prompt size stays
+    bounded either way. If a compaction fails, those turns are discarded
+    without a summary, so a session's memory stays bounded too.
+
+    summarize is an async callable (previous_summary, turns, max_tokens)
+    returning the new summary; by default the shared LLM client writes it.
+    Memory lives in the process; sessions beyond max_sessions are evicted
+    least recently used first.
+    """
+
+    def __init__(self, budget_tokens=MEMORY_TOKEN_BUDGET, summary_tokens=MEMORY_SUMMARY_TOKENS,
+                 max_sessions=MEMORY_MAX_SESSIONS, summarize=None):
+        self.budget_tokens = budget_tokens
+        self.summary_tokens = summary_tokens
+        self.max_sessions = max_sessions
+        self.summarize = summarize or summarize_with_llm
+        self._sessions = OrderedDict()
+
+        self.compactions = 0
+        self.compaction_failures = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _session(self, session_id, create=False):
+        session = self._sessions.get(session_id)
+        if session is None and create:
+            session = self._sessions[session_id] = _Session()
+            while len(self._sessions) > self.max_sessions:
+                _, evicted = self._sessions.popitem(last=False)
+                if evicted.compaction is not None:
+                    evicted.compaction.cancel()
+        if session is not None:
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def build_messages(self, session_id, system_prompt, message):
+        """Return the chat-completion messages for the next turn of a session."""
+        messages = [{"role": "system", "content": system_prompt}]
+        session = self._session(session_id) if session_id is not None else None
+        if session is not None:
+            if session.summary:
+                messages.append({
+                    "role": "system",
+                    "content": f"Summary of the earlier conversation:\n{session.summary}",
+                })
+            # Newest turns first until the budget left after the summary is spent
+            remaining = self.budget_tokens - session.summary_tokens
+            recent = []
+            for user_message, bot_response, tokens in reversed(session.turns):
+                if tokens > remaining:
+                    break
+                remaining -= tokens
+                recent.append((user_message, bot_response))
+            for user_message, bot_response in reversed(recent):
+                messages.append({"role": "user", "content": user_message})
+                messages.append({"role": "assistant", "content": bot_response})
+        messages.append({"role": "user", "content": message})
+        return messages
+
+    async def add_turn(self, session_id, user_message, bot_response):
+        """Record a finished turn and start a compaction if the budget is exceeded."""
+        if session_id is None:
+            return
+        session = self._session(session_id, create=True)
+        tokens = estimate_tokens(user_message) + estimate_tokens(bot_response)
+        session.turns.append((user_message, bot_response, tokens))
+        if session.compaction is None and session.history_tokens() > self.budget_tokens:
+            session.compaction = asyncio.ensure_future(self._compact(session))
+
+    def clear(self, session_id):
+        session = self._sessions.pop(session_id, None)
+        if session is not None and session.compaction is not None:
+            session.compaction.cancel()
+
+    async def wait_idle(self):
+        """Wait for running compactions; mostly useful in tests and at shutdown."""
+        pending = [s.compaction for s in self._sessions.values() if s.compaction is not None]
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    def _retire_count(self, session):
+        # Retire the oldest turns until what stays fits in half the budget,
+        # leaving room for the summary and a few more turns before the next run
+        keep_tokens = self.budget_tokens // 2
+        kept = 0
+        count = len(session.turns)
+        for _, _, tokens in reversed(session.turns):
+            if kept + tokens > keep_tokens and count < len(session.turns):
+                break
+            kept += tokens
+            count -= 1
+        return count
+
+    async def _compact(self, session):
+        try:
+            count = self._retire_count(session)
+            if count == 0:
+                return
+            retired = [(user, bot) for user, bot, _ in session.turns[:count]]
+            summary = await self.summarize(session.summary, retired, self.summary_tokens)
+            summary = summary.strip()[:self.summary_tokens * 4]
+            # Turns are only ever appended, so the retired ones are still first
+            del session.turns[:count]
+            session.summary = summary
+            session.summary_tokens = estimate_tokens(summary) if summary else 0
+            self.compactions += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.compaction_failures += 1
+            logger.error(f"Conversation compaction failed: {str(e)}")
+            self._drop_unfit_turns(session)
+        finally:
+            session.compaction = None
+
+    def _drop_unfit_turns(self, session):
+        # Same cut as build_messages: the newest turns that fit next to the summary
+        remaining = self.budget_tokens - session.summary_tokens
+        keep = 0
+        for _, _, tokens in reversed(session.turns):
+            if tokens > remaining:
+                break
+            remaining -= tokens
+            keep += 1
+        del session.turns[:len(session.turns) - keep]
+
+    def stats(self):
+        return {
+            "sessions": len(self._sessions),
+            "compactions": self.compactions,
+            "compaction_failures": self.compaction_failures,
+        }
+
+
+async def summarize_with_llm(previous_summary, turns, max_tokens):
+    """Fold turns into previous_summary with one call to the shared LLM client."""
+    from .llm_client import get_llm_client
+
+    lines = [f"Earlier summary:\n{previous_summary or '(none)'}", "", "New turns:"]
+    for user_message, bot_response in turns:
+        lines.append(f"User: {user_message}")
+        lines.append(f"Assistant: {bot_response}")
+    return await get_llm_client().complete(
+        [
+            {"role": "system", "content": SUMMARY_PROMPT.format(words=max_tokens * 3 // 4)},
+            {"role": "user", "content": "\n".join(lines)},
+        ],
+        temperature=0,
+        use_cache=False,
+    )
@@ -0,0 +1,160 @@
+"""Prometheus metrics, recorded with prometheus_client.
+
+Under gunicorn every worker is its own process. gunicorn.conf.py points
+PROMETHEUS_MULTIPROC_DIR at a shared directory before the app is
+imported; each worker then writes its samples there and /metrics
+aggregates all of them, so a scrape of any worker sees the whole server.
+Without it (uvicorn, tests) the metrics live in the process as usual.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Seconds; spans fast intent matches up to slow upstream completions
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route, method and status code.",
+    ["method", "route", "status"],
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Time from request start to the last byte sent.",
+    ["method", "route"], buckets=DEFAULT_BUCKETS,
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.", multiprocess_mode="livesum",
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Chat requests turned away by reason (rate_limited, queue_full, queue_timeout).",
+    ["reason"],
+)
+ADMISSION_QUEUED = Gauge(
+    "admission_queued", "Chat requests waiting for an in-flight slot.", multiprocess_mode="livesum",
+)
+
+CHAT_STAGE_SECONDS = Histogram(
+    "chat_stage_duration_seconds",
+    "Time spent in each stage of the chat pipeline (intent, retrieval, llm, persist).",
+    ["stage"], buckets=DEFAULT_BUCKETS,
+)
+INTENT_LOOKUPS = Counter(
+    "intent_lookups_total", "Intent lookups by source (matcher, classifier) or miss.",
+    ["result"],
+)
+KNOWLEDGE_LOOKUPS = Counter(
+    "knowledge_lookups_total", "Local knowledge base lookups by result (hit, miss).", ["result"],
+)
+LLM_REQUESTS = Counter(
+    "llm_requests_total",
+    "Upstream LLM calls by outcome, including cache hits and coalesced duplicates.",
+    ["outcome"],
+)
+LLM_UPSTREAM_SECONDS = Histogram(
+    "llm_upstream_duration_seconds",
+    "Time waiting on the upstream model, excluding the concurrency queue.",
+    ["mode"], buckets=DEFAULT_BUCKETS,
+)
+CHAT_DEGRADED = Counter(
+    "chat_degraded_total",
+    "Chat replies answered by the local fallback tiers because the LLM was unavailable.",
+)
+LLM_IN_FLIGHT = Gauge(
+    "llm_requests_in_flight", "Upstream LLM calls currently open.", multiprocess_mode="livesum",
+)
+LLM_CIRCUIT_OPEN = Gauge(
+    "llm_circuit_open", "1 while the upstream LLM circuit breaker is open.",
+    multiprocess_mode="livemax",
+)
+LLM_CIRCUIT_TRIPS = Counter("llm_circuit_trips_total", "Times the upstream circuit breaker opened.")
+RESPONSE_CACHE_HITS = Counter("response_cache_hits_total", "Response cache hits.")
+RESPONSE_CACHE_MISSES = Counter("response_cache_misses_total", "Response cache misses.")
+RESPONSE_CACHE_ENTRIES = Gauge(
+    "response_cache_entries", "Entries held in the in-memory response cache.",
+    multiprocess_mode="livesum",
+)
+DB_FLUSH_SECONDS = Histogram(
+    "db_flush_duration_seconds", "Time to insert and commit one batch of conversation rows.",
+    buckets=DEFAULT_BUCKETS,
+)
+DB_ROWS = Counter(
+    "db_rows_total", "Conversation rows by outcome (written, dropped).", ["result"],
+)
+DB_QUEUE_DEPTH = Gauge(
+    "conversation_write_queue_depth", "Conversation rows waiting for the write-behind flush.",
+    multiprocess_mode="livesum",
+)
+
+
+def render_metrics():
+    """Return the /metrics body: every worker's samples under gunicorn, else this process's."""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+@contextmanager
+def stage(name):
+    """Record the duration of one chat pipeline stage."""
+    child = CHAT_STAGE_SECONDS.labels(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        child.observe(time.perf_counter() - started)
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request.
+
+    Requests are labelled with the matched route template rather than the
+    raw path so path parameters such as job ids do not create new series.
+    Streaming responses are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app, skip_paths=("/metrics",)):
+        self.app = app
+        self.skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in self.skip_paths:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            route = getattr(route, "path", None) or scope.get("route_path") or "unmatched"
+            method = scope["method"]
+            HTTP_REQUEST_SECONDS.labels(method, route).observe(time.perf_counter() - started)
+            HTTP_REQUESTS.labels(method, route, status).inc()
@@ -1 +1,15 @@
 # Model package
+import os
+
+
+def _default_data_dir():
+    # backend/data inside the Docker image, the repository's data/ in a checkout
+    here = os.path.dirname(os.path.abspath(__file__))
+    for candidate in ('../../data', '../../../data'):
+        path = os.path.normpath(os.path.join(here, candidate))
+        if os.path.isdir(path):
+            return path
+    return os.path.normpath(os.path.join(here, '../../data'))
+
+
+DATA_DIR = os.getenv("DATA_DIR") or _default_data_dir()
@@ -1,38 +1,264 @@
+import asyncio
 import json
+import logging
 import random
 import os
-import openai
-from dotenv import load_dotenv
 
-load_dotenv()
+from ..llm_client import LLMError, get_llm_client
+from ..memory import ConversationMemory
+from ..metrics import CHAT_DEGRADED, INTENT_LOOKUPS, KNOWLEDGE_LOOKUPS, stage
+from . import DATA_DIR
+from .intent_matcher import IntentMatcher
+from .knowledge_base import KnowledgeBase
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "You are a helpful and friendly AI assistant."
+
+# Seconds a chat request may wait on the LLM, queueing included
+CHAT_DEADLINE = float(os.getenv("CHAT_DEADLINE", "10"))
+
+# Upstream completions one batch may have in flight at once
+CHAT_BATCH_CONCURRENCY = int(os.getenv("CHAT_BATCH_CONCURRENCY", "16"))
+
+FALLBACK_RESPONSE = (
+    "I'm having trouble reaching my language model right now, so I can only "
+    "answer simple questions. Please try again in a little while."
+)
+
+class IntentModel:
+    """The intents, the pattern matcher built from them and the trained classifier.
+
+    They are only ever replaced together, so a request that reads
+    engine.intent_model once sees tags, patterns and weights that agree.
+    """
+
+    __slots__ = ("intents", "intents_by_tag", "matcher", "classifier")
+
+    def __init__(self, intents, classifier=None, word_boundary=False):
+        self.intents = intents
+        self.intents_by_tag = {intent['tag']: intent for intent in intents['intents']}
+        self.matcher = IntentMatcher(intents['intents'], word_boundary=word_boundary)
+        self.classifier = classifier
 
 class ChatbotEngine:
     def __init__(self):
-        self.intents = self.load_intents()
-        openai.api_key = os.getenv("OPENAI_API_KEY")
+        self.word_boundary = os.getenv("INTENT_WORD_BOUNDARY", "false").lower() == "true"
+        self.intent_model = IntentModel(self.load_intents(), self.load_classifier(), self.word_boundary)
+        self.knowledge_base = self.load_knowledge_base()
+        self.memory = ConversationMemory()
+        self.confidence_threshold = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.75"))
+        # Looser local matching used only while the LLM is unavailable
+        self.degraded_confidence_threshold = float(os.getenv("DEGRADED_CONFIDENCE_THRESHOLD", "0.4"))
+        self.degraded_min_coverage = float(os.getenv("DEGRADED_MIN_COVERAGE", "0.4"))
+        self.deadline = CHAT_DEADLINE
 
     def load_intents(self):
-        intents_path = os.path.join(os.path.dirname(__file__), '../../data/intents.json')
+        intents_path = os.path.join(DATA_DIR, 'intents.json')
         with open(intents_path, 'r') as file:
             return json.load(file)
 
-    def get_response(self, message):
+    def load_classifier(self):
+        # Imported lazily so NumPy is only loaded when a trained model exists
+        from .classifier import IntentClassifier
+
+        # The trained model is optional; without it we go straight to the LLM
+        if not IntentClassifier.exists():
+            return None
         try:
-            # First try to find a matching intent for common queries
-            for intent in self.intents['intents']:
-                if any(pattern.lower() in message.lower() for pattern in intent['patterns']):
-                    return random.choice(intent['responses'])
-
-            # If no matching intent found, use OpenAI API
-            openai_response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {"role": "system", "content": "You are a helpful and friendly AI assistant."},
-                    {"role": "user", "content": message}
-                ]
-            )
-            return openai_response.choices[0].message.content
+            return IntentClassifier.load()
+        except Exception as e:
+            logger.error(f"Failed to load intent classifier: {str(e)}")
+            return None
 
+    def load_knowledge_base(self):
+        # Knowledge files are optional; without them every miss goes to the LLM
+        try:
+            return KnowledgeBase.load()
+        except Exception as e:
+            logger.error(f"Failed to load knowledge base: {str(e)}")
+            return KnowledgeBase([])
+
+    def reload_classifier(self, model_dir):
+        """Swap in a newly trained model without interrupting requests.
+
+        The new IntentModel (intents, matcher and classifier) is fully built
+        before a single reference assignment replaces the old one, so
+        in-flight requests see either the old model or the new one.
+        """
+        from .classifier import IntentClassifier
+
+        self.intent_model = IntentModel(
+            self.load_intents(), IntentClassifier.load(model_dir), self.word_boundary
+        )
+
+    def warm_up(self):
+        """Pay one-off costs (tokenizer import, caches) before real traffic."""
+        if self.intent_model.classifier is not None:
+            self.classify("hello")
+
+    def classify(self, message, threshold=None):
+        """Return the intent predicted by the trained model, or None."""
+        return self._classify(self.intent_model, message, threshold)
+
+    def classify_many(self, messages, threshold=None):
+        """classify() for a list of messages in one vectorized forward pass."""
+        return self._classify_many(self.intent_model, messages, threshold)
+
+    def _classify(self, model, message, threshold):
+        if model.classifier is None:
+            return None
+        if threshold is None:
+            threshold = self.confidence_threshold
+        try:
+            tag = model.classifier.classify(message, threshold)
+        except Exception as e:
+            logger.error(f"Intent classification failed: {str(e)}")
+            return None
+        return model.intents_by_tag.get(tag)
+
+    def _classify_many(self, model, messages, threshold):
+        if model.classifier is None or not messages:
+            return [None] * len(messages)
+        if threshold is None:
+            threshold = self.confidence_threshold
+        try:
+            predictions = model.classifier.predict(messages)
+        except Exception as e:
+            logger.error(f"Intent classification failed: {str(e)}")
+            return [None] * len(messages)
+        return [
+            model.intents_by_tag.get(tag) if probability >= threshold else None
+            for tag, probability in predictions
+        ]
+
+    def match_intent(self, message):
+        """Return a canned intent response for common queries, or None."""
+        model = self.intent_model
+        with stage("intent"):
+            intent = model.matcher.match(message)
+            source = "matcher"
+            if intent is None:
+                intent = self._classify(model, message, None)
+                source = "classifier"
+        if intent is None:
+            INTENT_LOOKUPS.labels("miss").inc()
+            return None
+        INTENT_LOOKUPS.labels(source).inc()
+        return random.choice(intent['responses'])
+
+    def lookup_knowledge(self, message):
+        """Return a passage from the local knowledge base for confident matches, or None."""
+        with stage("retrieval"):
+            answer = self.knowledge_base.answer(message)
+        KNOWLEDGE_LOOKUPS.labels("hit" if answer is not None else "miss").inc()
+        return answer
+
+    def degraded_response(self, message):
+        """Best local answer while the LLM is failing: looser classifier and
+        knowledge-base thresholds, then a fixed apology."""
+        CHAT_DEGRADED.inc()
+        intent = self.classify(message, self.degraded_confidence_threshold)
+        if intent is not None:
+            return random.choice(intent['responses'])
+        answer = self.knowledge_base.answer(message, self.degraded_min_coverage)
+        return answer if answer is not None else FALLBACK_RESPONSE
+
+    def degraded_responses(self, messages):
+        """degraded_response() for a list of messages, classified in one forward pass."""
+        CHAT_DEGRADED.inc(len(messages))
+        intents = self.classify_many(messages, self.degraded_confidence_threshold)
+        responses = []
+        for message, intent in zip(messages, intents):
+            if intent is not None:
+                responses.append(random.choice(intent['responses']))
+                continue
+            answer = self.knowledge_base.answer(message, self.degraded_min_coverage)
+            responses.append(answer if answer is not None else FALLBACK_RESPONSE)
+        return responses
+
+    async def complete(self, message, session_id=None, system_prompt=SYSTEM_PROMPT, **options):
+        """Ask the LLM, with the session's compacted history, and remember the turn.
+
+        Raises LLMError if no answer arrives within the chat deadline.
+        """
+        messages = self.memory.build_messages(session_id, system_prompt, message)
+        options.setdefault("timeout", self.deadline)
+        with stage("llm"):
+            try:
+                response = await asyncio.wait_for(
+                    get_llm_client().complete(messages, **options), self.deadline
+                )
+            except asyncio.TimeoutError as e:
+                raise LLMError(f"No answer within the {self.deadline}s chat deadline") from e
+        await self.memory.add_turn(session_id, message, response)
+        return response
+
+    async def respond(self, message, session_id=None, system_prompt=SYSTEM_PROMPT):
+        """Return (response, degraded), asking the LLM first.
+
+        degraded is True when the LLM failed, missed the deadline or had its
+        circuit open and the answer came from degraded_response instead.
+        The local tiers are only a fallback: substring intent patterns and
+        keyword retrieval misfire on ordinary questions ("hi" in "this").
+        """
+        try:
+            return await self.complete(message, session_id, system_prompt), False
+        except LLMError as e:
+            logger.warning(f"Falling back to local answers: {str(e)}")
+            response = self.degraded_response(message)
+            await self.memory.add_turn(session_id, message, response)
+            return response, True
+
+    async def respond_many(self, messages, system_prompt=SYSTEM_PROMPT,
+                           max_concurrency=CHAT_BATCH_CONCURRENCY):
+        """respond() for a list of independent messages; results keep their order.
+
+        Every message goes upstream, at most max_concurrency at a time;
+        those whose call fails are then answered locally, classified
+        together in one forward pass. Batch items carry no session memory.
+        """
+        results = [None] * len(messages)
+        failed = []
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def ask(index):
+            async with semaphore:
+                try:
+                    results[index] = (await self.complete(messages[index], None, system_prompt), False)
+                except LLMError:
+                    failed.append(index)
+
+        await asyncio.gather(*[ask(i) for i in range(len(messages))])
+        if failed:
+            failed.sort()
+            responses = self.degraded_responses([messages[i] for i in failed])
+            for index, response in zip(failed, responses):
+                results[index] = (response, True)
+        return results
+
+    async def get_response(self, message, session_id=None):
+        try:
+            response, _ = await self.respond(message, session_id)
+            return response
         except Exception as e:
             print(f"Error generating response: {str(e)}")
             return "I'm sorry, I'm having trouble processing your request. Please try again later."
+
+    async def stream_response(self, message, session_id=None):
+        """Yield the LLM's reply in chunks; a local fallback arrives as one chunk."""
+        parts = []
+        messages = self.memory.build_messages(session_id, SYSTEM_PROMPT, message)
+        with stage("llm"):
+            try:
+                async for chunk in get_llm_client().stream(messages, timeout=self.deadline):
+                    parts.append(chunk)
+                    yield chunk
+            except LLMError as e:
+                # Once part of the answer is out there is nothing to fall back to
+                if parts:
+                    raise
+                logger.warning(f"Falling back to local answers: {str(e)}")
+                parts.append(self.degraded_response(message))
+                yield parts[0]
+        await self.memory.add_turn(session_id, message, "".join(parts))
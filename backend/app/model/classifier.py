@@ -0,0 +1,78 @@
+import os
+import pickle
+
+import numpy as np
+
+from . import DATA_DIR
+from .features import bag_of_words, build_word_index, tokenize
+
+MODEL_DIR = DATA_DIR
+WEIGHTS_FILE = 'chatbot_weights.npz'
+
+
+def _relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def _softmax(x):
+    x = x - x.max(axis=1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=1, keepdims=True)
+    return x
+
+
+class IntentClassifier:
+    """NumPy forward pass for the dense intent model trained by train_model.
+
+    The Keras network is Dense(relu) -> Dropout -> Dense(relu) -> Dropout ->
+    Dense(softmax); dropout is a no-op at inference, so serving only needs
+    the exported kernels and biases. TensorFlow is never imported.
+    """
+
+    def __init__(self, words, classes, layers):
+        self.words = list(words)
+        self.classes = list(classes)
+        self.word_index = build_word_index(self.words)
+        self.layers = [
+            (np.ascontiguousarray(kernel, dtype=np.float32), np.asarray(bias, dtype=np.float32))
+            for kernel, bias in layers
+        ]
+
+    @classmethod
+    def load(cls, model_dir=MODEL_DIR):
+        with open(os.path.join(model_dir, 'words.pkl'), 'rb') as f:
+            words = pickle.load(f)
+        with open(os.path.join(model_dir, 'classes.pkl'), 'rb') as f:
+            classes = pickle.load(f)
+        with np.load(os.path.join(model_dir, WEIGHTS_FILE)) as weights:
+            arrays = [weights[f'arr_{i}'] for i in range(len(weights.files))]
+        layers = list(zip(arrays[0::2], arrays[1::2]))
+        return cls(words, classes, layers)
+
+    @classmethod
+    def exists(cls, model_dir=MODEL_DIR):
+        return all(
+            os.path.exists(os.path.join(model_dir, name))
+            for name in ('words.pkl', 'classes.pkl', WEIGHTS_FILE)
+        )
+
+    def predict_proba(self, token_lists):
+        """Return class probabilities for a batch of tokenized messages."""
+        x = bag_of_words(token_lists, self.word_index)
+        last = len(self.layers) - 1
+        for i, (kernel, bias) in enumerate(self.layers):
+            x = x @ kernel
+            x += bias
+            x = _softmax(x) if i == last else _relu(x)
+        return x
+
+    def predict(self, messages):
+        """Return the (tag, probability) with the highest score for each message."""
+        probs = self.predict_proba([tokenize(message) for message in messages])
+        best = probs.argmax(axis=1)
+        return [(self.classes[c], float(probs[row, c])) for row, c in enumerate(best)]
+
+    def classify(self, message, threshold=0.0):
+        """Return the predicted tag for one message, or None below threshold."""
+        tag, probability = self.predict([message])[0]
+        return tag if probability >= threshold else None
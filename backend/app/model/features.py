@@ -0,0 +1,48 @@
+from functools import lru_cache
+
+import numpy as np
+
+IGNORE_LETTERS = ['!', '?', ',', '.']
+
+
+@lru_cache(maxsize=None)
+def _nltk():
+    # NLTK takes a noticeable time to import, so defer it to the first use
+    import nltk
+    from nltk.stem import WordNetLemmatizer
+    return nltk.word_tokenize, WordNetLemmatizer()
+
+
+@lru_cache(maxsize=65536)
+def lemmatize(word):
+    return _nltk()[1].lemmatize(word.lower())
+
+
+def tokenize(sentence):
+    """Split a sentence into lower-cased lemmas, dropping punctuation tokens."""
+    word_tokenize = _nltk()[0]
+    return [lemmatize(word) for word in word_tokenize(sentence) if word not in IGNORE_LETTERS]
+
+
+def build_word_index(words):
+    return {word: column for column, word in enumerate(words)}
+
+
+def bag_of_words(token_lists, word_index, dtype=np.float32):
+    """Build a (documents x vocabulary) 0/1 matrix from tokenized documents.
+
+    Only the tokens of each document are looked up, so the cost is
+    proportional to the number of tokens rather than the vocabulary size.
+    """
+    rows = []
+    cols = []
+    for row, tokens in enumerate(token_lists):
+        for token in tokens:
+            column = word_index.get(token)
+            if column is not None:
+                rows.append(row)
+                cols.append(column)
+
+    bags = np.zeros((len(token_lists), len(word_index)), dtype=dtype)
+    bags[rows, cols] = 1
+    return bags
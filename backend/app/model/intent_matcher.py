@@ -0,0 +1,126 @@
+from collections import deque
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+
+class IntentMatcher:
+    """Aho-Corasick automaton over every intent pattern.
+
+    Patterns are lower-cased and compiled once, so matching a message costs
+    one pass over its characters regardless of how many patterns exist.
+    match() keeps the original first-match semantics: the earliest intent in
+    intents.json with any pattern contained in the message wins.
+
+    With word_boundary=True a pattern only matches when it is not glued to
+    surrounding letters or digits (so "hi" no longer matches "this").
+    """
+
+    def __init__(self, intents, word_boundary=False):
+        self.intents = list(intents)
+        self.word_boundary = word_boundary
+
+        self._goto = [{}]
+        self._fail = [0]
+        # Patterns ending exactly at a node, as (length, intent_index)
+        self._outputs = [[]]
+        # Lowest intent index among outputs reachable through fail links
+        self._best = [None]
+        # Next node on the fail chain that has outputs of its own
+        self._output_link = [0]
+        self._empty_match = None
+
+        for index, intent in enumerate(self.intents):
+            for pattern in intent['patterns']:
+                self._add(pattern.lower(), index)
+        self._build()
+
+    def _add(self, pattern, intent_index):
+        if not pattern:
+            if self._empty_match is None:
+                self._empty_match = intent_index
+            return
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+                self._best.append(None)
+                self._output_link.append(0)
+            node = next_node
+        self._outputs[node].append((len(pattern), intent_index))
+
+    def _build(self):
+        queue = deque()
+        for node in self._goto[0].values():
+            queue.append(node)
+        while queue:
+            node = queue.popleft()
+            fail = self._fail[node]
+            own = [index for _, index in self._outputs[node]]
+            inherited = self._best[fail]
+            if inherited is not None:
+                own.append(inherited)
+            self._best[node] = min(own) if own else None
+            self._output_link[node] = fail if self._outputs[fail] else self._output_link[fail]
+
+            for char, child in self._goto[node].items():
+                state = fail
+                while state and char not in self._goto[state]:
+                    state = self._fail[state]
+                target = self._goto[state].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                queue.append(child)
+
+    def match_index(self, message):
+        """Return the index of the first matching intent, or None."""
+        text = message.lower()
+        best = self._empty_match
+        if best == 0:
+            return best
+
+        goto, fail = self._goto, self._fail
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if not node or self._best[node] is None:
+                continue
+            if best is not None and self._best[node] >= best:
+                continue
+
+            if self.word_boundary:
+                candidate = self._boundary_match(text, node, position)
+            else:
+                candidate = self._best[node]
+            if candidate is not None and (best is None or candidate < best):
+                best = candidate
+                if best == 0:
+                    break
+        return best
+
+    def match(self, message):
+        """Return the first matching intent dict, or None."""
+        index = self.match_index(message)
+        return None if index is None else self.intents[index]
+
+    def _boundary_match(self, text, node, end):
+        best = None
+        while node:
+            for length, index in self._outputs[node]:
+                if best is not None and index >= best:
+                    continue
+                start = end - length + 1
+                if _is_word_char(text[start]) and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if _is_word_char(text[end]) and end + 1 < len(text) and _is_word_char(text[end + 1]):
+                    continue
+                best = index
+            node = self._output_link[node]
+        return best
@@ -0,0 +1,210 @@
+import json
+import math
+import os
+import re
+
+from . import DATA_DIR
+
+KNOWLEDGE_DIR = os.path.join(DATA_DIR, 'knowledge')
+DEFAULT_KNOWLEDGE_FILES = [os.path.join(DATA_DIR, 'villie_config.json')]
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in into is it me of on or
+please tell that the their them there these this to use used using was what
+when where which who why will with you your about explain give list show
+""".split())
+
+
+def tokenize(text):
+    """Lower-case word tokens without stopwords, with a light plural stem."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower().replace('_', ' ')):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def _humanize(key):
+    return str(key).replace('_', ' ').strip().capitalize()
+
+
+def _is_scalar_list(value):
+    return isinstance(value, list) and all(not isinstance(item, (dict, list)) for item in value)
+
+
+def flatten_json(node, path=()):
+    """Turn nested JSON into (title, text) passages.
+
+    Every object with scalar fields becomes one passage titled by its path
+    ("Chatbot types > Rule based"); nested objects and lists of objects
+    become passages of their own.
+    """
+    passages = []
+    if isinstance(node, dict):
+        lines = []
+        for key, value in node.items():
+            if isinstance(value, dict) or (isinstance(value, list) and not _is_scalar_list(value)):
+                passages.extend(flatten_json(value, path + (key,)))
+            elif _is_scalar_list(value):
+                lines.append(f"{_humanize(key)}: {', '.join(str(item) for item in value)}")
+            else:
+                lines.append(f"{_humanize(key)}: {value}")
+        if lines:
+            title = ' > '.join(_humanize(key) for key in path) or 'Overview'
+            passages.insert(0, (title, '\n'.join(lines)))
+    elif isinstance(node, list):
+        for index, item in enumerate(node):
+            if isinstance(item, (dict, list)):
+                passages.extend(flatten_json(item, path + (str(index + 1),)))
+            else:
+                title = ' > '.join(_humanize(key) for key in path)
+                passages.append((title, str(item)))
+    return passages
+
+
+def split_text(text, title):
+    """Split plain text into paragraph passages."""
+    return [(title, paragraph.strip()) for paragraph in re.split(r"\n\s*\n", text) if paragraph.strip()]
+
+
+def load_passages(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        if path.endswith('.json'):
+            data = json.load(file)
+            # Skip the single wrapper key most knowledge files have
+            if isinstance(data, dict) and len(data) == 1:
+                data = next(iter(data.values()))
+            return flatten_json(data)
+        title = _humanize(os.path.splitext(os.path.basename(path))[0])
+        return split_text(file.read(), title)
+
+
+def default_knowledge_files():
+    paths = os.getenv("KNOWLEDGE_FILES")
+    if paths:
+        return [path for path in paths.split(os.pathsep) if path]
+    files = [path for path in DEFAULT_KNOWLEDGE_FILES if os.path.exists(path)]
+    if os.path.isdir(KNOWLEDGE_DIR):
+        files.extend(
+            os.path.join(KNOWLEDGE_DIR, name) for name in sorted(os.listdir(KNOWLEDGE_DIR))
+            if name.endswith(('.json', '.txt', '.md'))
+        )
+    return files
+
+
+class KnowledgeBase:
+    """BM25 retrieval over passages from local knowledge files.
+
+    The per-term BM25 weight of every posting is computed once when the
+    index is built, so a query is a handful of dictionary lookups and
+    additions. answer() only returns a passage when it is a confident
+    match: it must cover at least min_coverage of the query's IDF mass,
+    contain at least min_terms distinct query terms, score at least
+    min_score and share min_heading_terms terms with its own heading (the
+    last part of its title). Coverage alone is not enough for short
+    queries: "is it free" has one content term, so any passage mentioning
+    "free" covers all of it. The heading check stops a general question
+    from landing on a detail passage that only shares a parent section
+    ("What is natural language processing?" on the Transformers entry)
+    or a few words of body text. The score floor depends on the corpus
+    size, so it is tuned for the bundled knowledge files. Paragraphs of
+    text files are headed by the file name, so name files after their
+    topic.
+    """
+
+    def __init__(self, passages, k1=1.5, b=0.75, min_coverage=None, min_terms=None, min_score=None,
+                 min_heading_terms=None):
+        self.passages = list(passages)
+        self.min_coverage = min_coverage if min_coverage is not None else float(
+            os.getenv("KNOWLEDGE_MIN_COVERAGE", "0.75")
+        )
+        self.min_terms = min_terms if min_terms is not None else int(
+            os.getenv("KNOWLEDGE_MIN_TERMS", "2")
+        )
+        self.min_score = min_score if min_score is not None else float(
+            os.getenv("KNOWLEDGE_MIN_SCORE", "6.0")
+        )
+        self.min_heading_terms = min_heading_terms if min_heading_terms is not None else int(
+            os.getenv("KNOWLEDGE_MIN_HEADING_TERMS", "1")
+        )
+        self.headings = [frozenset(tokenize(title.rsplit(' > ', 1)[-1])) for title, _ in self.passages]
+
+        documents = [tokenize(f"{title} {text}") for title, text in self.passages]
+        count = len(documents)
+        average_length = sum(len(tokens) for tokens in documents) / count if count else 0.0
+
+        frequencies = {}
+        for doc_id, tokens in enumerate(documents):
+            for token in tokens:
+                postings = frequencies.setdefault(token, {})
+                postings[doc_id] = postings.get(doc_id, 0) + 1
+
+        self.idf = {}
+        self.postings = {}
+        for token, postings in frequencies.items():
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            self.idf[token] = idf
+            self.postings[token] = [
+                (doc_id, idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(documents[doc_id]) / average_length)))
+                for doc_id, tf in postings.items()
+            ]
+        # Terms never seen in the corpus weigh as much as the rarest known term
+        self.unknown_idf = math.log(1 + (count + 0.5) / 0.5)
+
+    @classmethod
+    def load(cls, paths=None, **options):
+        passages = []
+        for path in paths if paths is not None else default_knowledge_files():
+            passages.extend(load_passages(path))
+        return cls(passages, **options)
+
+    def __len__(self):
+        return len(self.passages)
+
+    def _rank(self, query, k):
+        terms = set(tokenize(query))
+        if not terms or not self.passages:
+            return []
+
+        scores = {}
+        matched = {}
+        counts = {}
+        for term in terms:
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc_id, weight in self.postings[term]:
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight
+                matched[doc_id] = matched.get(doc_id, 0.0) + idf
+                counts[doc_id] = counts.get(doc_id, 0) + 1
+
+        total_idf = sum(self.idf.get(term, self.unknown_idf) for term in terms)
+        best = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [(scores[doc_id], matched[doc_id] / total_idf, counts[doc_id], doc_id) for doc_id in best]
+
+    def search(self, query, k=3):
+        """Return up to k (score, coverage, title, text) results, best first."""
+        return [
+            (score, coverage, *self.passages[doc_id])
+            for score, coverage, _, doc_id in self._rank(query, k)
+        ]
+
+    def answer(self, query, min_coverage=None):
+        """Return the best passage formatted as a reply, or None if unsure."""
+        results = self._rank(query, 1)
+        if not results:
+            return None
+        score, coverage, terms, doc_id = results[0]
+        if coverage < (self.min_coverage if min_coverage is None else min_coverage):
+            return None
+        if terms < self.min_terms or score < self.min_score:
+            return None
+        if len(self.headings[doc_id].intersection(tokenize(query))) < self.min_heading_terms:
+            return None
+        title, text = self.passages[doc_id]
+        return f"{title}\n{text}"
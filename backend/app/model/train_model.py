@@ -2,77 +2,75 @@ import json
 import pickle
 import numpy as np
 import tensorflow as tf
-import nltk
-from nltk.stem import WordNetLemmatizer
-import random
 import os
 
-def train_model():
-    lemmatizer = WordNetLemmatizer()
+from . import DATA_DIR
+from .features import bag_of_words, build_word_index, tokenize
 
+MODEL_DIR = DATA_DIR
+
+def train_model(model_dir=MODEL_DIR, epochs=200, on_epoch_end=None):
+    """Train the intent model and write its artifacts to model_dir.
+
+    on_epoch_end, if given, is called as on_epoch_end(epoch, logs) after
+    every epoch (epoch is 1-based) so callers can report progress.
+    """
     # Load intents
-    intents_path = os.path.join(os.path.dirname(__file__), '../../data/intents.json')
+    intents_path = os.path.join(DATA_DIR, 'intents.json')
     with open(intents_path, 'r') as file:
         intents = json.load(file)
 
-    words = []
-    classes = []
+    # Tokenize and lemmatize every pattern exactly once
     documents = []
-    ignore_letters = ['!', '?', ',', '.']
+    labels = []
+    classes = sorted({intent['tag'] for intent in intents['intents']})
+    class_index = {tag: i for i, tag in enumerate(classes)}
 
     for intent in intents['intents']:
         for pattern in intent['patterns']:
-            word_list = nltk.word_tokenize(pattern)
-            words.extend(word_list)
-            documents.append((word_list, intent['tag']))
-            if intent['tag'] not in classes:
-                classes.append(intent['tag'])
-
-    words = [lemmatizer.lemmatize(w.lower()) for w in words if w not in ignore_letters]
-    words = sorted(list(set(words)))
-    classes = sorted(list(set(classes)))
-
-    # Create training data
-    training = []
-    output_empty = [0] * len(classes)
+            documents.append(tokenize(pattern))
+            labels.append(class_index[intent['tag']])
 
-    for document in documents:
-        bag = []
-        word_patterns = document[0]
-        word_patterns = [lemmatizer.lemmatize(word.lower()) for word in word_patterns]
-        for word in words:
-            bag.append(1) if word in word_patterns else bag.append(0)
+    words = sorted({word for tokens in documents for word in tokens})
+    word_index = build_word_index(words)
 
-        output_row = list(output_empty)
-        output_row[classes.index(document[1])] = 1
-        training.append([bag, output_row])
+    # Compact uint8 bag-of-words matrix built by column lookup, plus one-hot labels
+    train_x = bag_of_words(documents, word_index, dtype=np.uint8)
+    train_y = np.eye(len(classes), dtype=np.float32)[labels]
 
-    random.shuffle(training)
-    training = np.array(training, dtype=object)
-
-    train_x = list(training[:, 0])
-    train_y = list(training[:, 1])
+    order = np.random.permutation(len(documents))
+    train_x = train_x[order]
+    train_y = train_y[order]
 
     # Build model
     model = tf.keras.Sequential()
-    model.add(tf.keras.layers.Dense(128, input_shape=(len(train_x[0]),), activation='relu'))
+    model.add(tf.keras.layers.Dense(128, input_shape=(train_x.shape[1],), activation='relu'))
     model.add(tf.keras.layers.Dropout(0.5))
     model.add(tf.keras.layers.Dense(64, activation='relu'))
     model.add(tf.keras.layers.Dropout(0.5))
-    model.add(tf.keras.layers.Dense(len(train_y[0]), activation='softmax'))
+    model.add(tf.keras.layers.Dense(train_y.shape[1], activation='softmax'))
 
     sgd = tf.keras.optimizers.SGD(learning_rate=0.01, momentum=0.9, nesterov=True)
     model.compile(loss='categorical_crossentropy', optimizer=sgd, metrics=['accuracy'])
 
+    callbacks = []
+    if on_epoch_end is not None:
+        callbacks.append(tf.keras.callbacks.LambdaCallback(
+            on_epoch_end=lambda epoch, logs: on_epoch_end(epoch + 1, logs or {})
+        ))
+
     # Train model
-    hist = model.fit(np.array(train_x), np.array(train_y), epochs=200, batch_size=5, verbose=1)
+    hist = model.fit(train_x, train_y, epochs=epochs, batch_size=5, verbose=1, callbacks=callbacks)
 
     # Save model and data
-    model_dir = os.path.join(os.path.dirname(__file__), '../../data')
     os.makedirs(model_dir, exist_ok=True)
 
     model.save(os.path.join(model_dir, 'chatbot_model.h5'), hist)
 
+    # Export the dense kernels/biases so serving can run the forward pass in NumPy
+    dense_weights = [w for layer in model.layers for w in layer.get_weights()]
+    np.savez(os.path.join(model_dir, 'chatbot_weights.npz'), *dense_weights)
+
     with open(os.path.join(model_dir, 'words.pkl'), 'wb') as f:
         pickle.dump(words, f)
     with open(os.path.join(model_dir, 'classes.pkl'), 'wb') as f:
@@ -0,0 +1,189 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .metrics import RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_HITS, RESPONSE_CACHE_MISSES
+
+
+def normalize_message(message):
+    return " ".join(message.lower().split())
+
+
+class ResponseCache:
+    """LRU + TTL cache for LLM answers with an optional SQLite tier.
+
+    The in-memory tier holds at most max_entries answers and evicts the
+    least recently used one. When db_path is set, answers are also written
+    to a SQLite table so they survive restarts and are shared by every
+    process pointing at the same file. Entries older than ttl seconds are
+    treated as misses in both tiers.
+
+    get() and set() block on SQLite; code running on an event loop uses
+    aget() and aset(), which only touch the database from a worker thread.
+    The memory tier and the connection have separate locks, so a slow
+    database never holds up memory hits.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, db_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        self.evictions = 0
+
+        self._db = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def make_key(message, model, temperature=None, system_prompt="", history=()):
+        """Build a cache key from the normalized message and call parameters."""
+        payload = json.dumps(
+            [normalize_message(message), model, temperature, system_prompt, list(history)],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @classmethod
+    def key_for_messages(cls, messages, model, temperature=None):
+        """Build a key for a chat-completion message list."""
+        system_prompt = "\n".join(m["content"] for m in messages if m["role"] == "system")
+        turns = [(m["role"], m["content"]) for m in messages if m["role"] != "system"]
+        if not turns or turns[-1][0] != "user":
+            return None
+        return cls.make_key(turns[-1][1], model, temperature, system_prompt, turns[:-1])
+
+    def get(self, key):
+        now = time.time()
+        response = self._get_memory(key, now)
+        if response is None and self._db is not None:
+            response = self._get_persistent(key, now)
+        return self._count(response)
+
+    async def aget(self, key):
+        """get() that runs the SQLite lookup in a worker thread."""
+        now = time.time()
+        response = self._get_memory(key, now)
+        if response is None and self._db is not None:
+            response = await asyncio.to_thread(self._get_persistent, key, now)
+        return self._count(response)
+
+    def set(self, key, response):
+        created_at = time.time()
+        self._store(key, response, created_at)
+        if self._db is not None:
+            self._persist(key, response, created_at)
+
+    async def aset(self, key, response):
+        """set() that runs the SQLite write in a worker thread."""
+        created_at = time.time()
+        self._store(key, response, created_at)
+        if self._db is not None:
+            await asyncio.to_thread(self._persist, key, response, created_at)
+
+    def _get_memory(self, key, now):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            response, created_at = entry
+            if now - created_at > self.ttl:
+                del self._entries[key]
+                RESPONSE_CACHE_ENTRIES.dec()
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    def _get_persistent(self, key, now):
+        with self._db_lock:
+            if self._db is None:
+                return None
+            row = self._db.execute(
+                "SELECT response, created_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or now - row[1] > self.ttl:
+            return None
+        self._store(key, row[0], row[1])
+        with self._lock:
+            self.persistent_hits += 1
+        return row[0]
+
+    def _persist(self, key, response, created_at):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, response, created_at) VALUES (?, ?, ?)",
+                    (key, response, created_at),
+                )
+
+    def _count(self, response):
+        with self._lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        (RESPONSE_CACHE_MISSES if response is None else RESPONSE_CACHE_HITS).inc()
+        return response
+
+    def _store(self, key, response, created_at):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if key not in self._entries:
+                RESPONSE_CACHE_ENTRIES.inc()
+            self._entries[key] = (response, created_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+                RESPONSE_CACHE_ENTRIES.dec()
+
+    def purge_expired(self):
+        """Drop expired rows from the SQLite tier."""
+        if self._db is None:
+            return 0
+        with self._db_lock:
+            cursor = self._db.execute(
+                "DELETE FROM response_cache WHERE created_at < ?", (time.time() - self.ttl,)
+            )
+            return cursor.rowcount
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "persistent_hits": self.persistent_hits,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+def response_cache_from_env():
+    return ResponseCache(
+        max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "1024")),
+        ttl=float(os.getenv("RESPONSE_CACHE_TTL", "3600")),
+        db_path=os.getenv("RESPONSE_CACHE_DB") or None,
+    )
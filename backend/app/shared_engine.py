@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+from .llm_client import close_llm_client, get_llm_client
+
+
+class SharedEngine:
+    """One ChatbotEngine and pooled LLM client for every session of a process.
+
+    Streamlit runs each session's script on its own thread. Holding this
+    object in st.cache_resource lets all of them share a single copy of the
+    intents, compiled matcher, classifier and knowledge base. Async calls
+    are submitted to a private event-loop thread, so every session reuses
+    the same upstream connection pool and response cache.
+    """
+
+    def __init__(self, engine=None):
+        if engine is None:
+            from .model.chatbot_engine import ChatbotEngine
+            engine = ChatbotEngine()
+        self.engine = engine
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="shared-engine-loop", daemon=True
+        )
+        self._thread.start()
+
+    def run(self, coroutine, timeout=None):
+        """Run a coroutine on the engine's loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(timeout)
+
+    def match_intent(self, message):
+        return self.engine.match_intent(message)
+
+    def lookup_knowledge(self, message):
+        return self.engine.lookup_knowledge(message)
+
+    def complete(self, messages, **options):
+        """Blocking chat completion through the shared LLMClient."""
+        return self.run(get_llm_client().complete(messages, **options))
+
+    def chat(self, message, session_id, system_prompt, **options):
+        """Blocking completion that carries the session's compacted history."""
+        return self.run(self.engine.complete(message, session_id, system_prompt, **options))
+
+    def remember(self, session_id, user_message, bot_response):
+        """Record a turn answered without the LLM so later prompts include it."""
+        self.run(self.engine.memory.add_turn(session_id, user_message, bot_response))
+
+    def forget(self, session_id):
+        self._loop.call_soon_threadsafe(self.engine.memory.clear, session_id)
+
+    def get_response(self, message, session_id=None):
+        return self.run(self.engine.get_response(message, session_id))
+
+    def close(self):
+        if not self._loop.is_running():
+            return
+        self.run(close_llm_client())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop.close()
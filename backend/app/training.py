@@ -0,0 +1,205 @@
+import datetime
+import importlib.util
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .model import DATA_DIR
+
+logger = logging.getLogger(__name__)
+
+MODEL_DIR = DATA_DIR
+JOBS_DIR = os.path.join(MODEL_DIR, 'models')
+ARTIFACTS = ('chatbot_model.h5', 'chatbot_weights.npz', 'words.pkl', 'classes.pkl')
+PROGRESS_FILE = 'progress.json'
+MAX_FINISHED_JOBS = int(os.getenv('TRAINING_MAX_FINISHED_JOBS', '20'))
+
+
+def _write_progress(job_dir, progress):
+    # Write-then-rename so the API process never reads a half-written file
+    path = os.path.join(job_dir, PROGRESS_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, path)
+
+
+def _read_progress(job_dir):
+    try:
+        with open(os.path.join(job_dir, PROGRESS_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _exit_with_parent(parent_pid):
+    # Pool workers would otherwise outlive an API process that was killed
+    # or shut down mid-job, holding the CPU and the job directory
+    def watch():
+        while os.getppid() == parent_pid:
+            time.sleep(1.0)
+        os._exit(1)
+
+    threading.Thread(target=watch, daemon=True).start()
+
+
+def run_training_job(job_dir, epochs):
+    """Entry point executed in the training worker process."""
+    # Imported here so TensorFlow is only ever loaded in the worker
+    from .model.train_model import train_model
+
+    def on_epoch_end(epoch, logs):
+        _write_progress(job_dir, {
+            "epoch": epoch,
+            "epochs": epochs,
+            "loss": float(logs.get("loss", 0.0)),
+            "accuracy": float(logs.get("accuracy", 0.0)),
+        })
+
+    train_model(model_dir=job_dir, epochs=epochs, on_epoch_end=on_epoch_end)
+
+
+class TrainingJobManager:
+    """Runs train_model in a separate process and tracks job status.
+
+    Jobs run one at a time in a spawned worker process, so training never
+    blocks the API event loop. When a job succeeds its artifacts are
+    promoted into MODEL_DIR and on_complete(job) is called so the serving
+    engine can swap to the new model. A finished job's directory is
+    removed and its final progress kept in memory; only the last
+    max_finished_jobs finished jobs are remembered.
+    """
+
+    def __init__(self, on_complete=None, jobs_dir=JOBS_DIR, model_dir=MODEL_DIR,
+                 target=run_training_job, max_finished_jobs=MAX_FINISHED_JOBS):
+        self.on_complete = on_complete
+        self.jobs_dir = jobs_dir
+        self.model_dir = model_dir
+        self.target = target
+        self.max_finished_jobs = max_finished_jobs
+        self.jobs = {}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        """Return False when the default job cannot run because TensorFlow is missing.
+
+        The serving image leaves TensorFlow out (see requirements-train.txt),
+        so /train can refuse up front instead of failing inside the worker.
+        """
+        return self.target is not run_training_job or importlib.util.find_spec('tensorflow') is not None
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=1,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_exit_with_parent,
+                initargs=(os.getpid(),),
+            )
+        return self._executor
+
+    def start(self, epochs=200):
+        job_id = uuid.uuid4().hex
+        job_dir = os.path.join(self.jobs_dir, job_id)
+        os.makedirs(job_dir, exist_ok=True)
+
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "epochs": epochs,
+            "model_dir": job_dir,
+            "created_at": datetime.datetime.utcnow().isoformat(),
+            "finished_at": None,
+            "error": None,
+            "progress": None,
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+            try:
+                future = self._get_executor().submit(self.target, job_dir, epochs)
+            except BrokenProcessPool:
+                # A previous worker died; start a fresh pool for this job
+                self._executor = None
+                future = self._get_executor().submit(self.target, job_dir, epochs)
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        return job_id
+
+    def status(self, job_id):
+        """Return a snapshot of the job including per-epoch progress, or None."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        status = dict(job)
+        status.pop("model_dir")
+        progress = status.pop("progress")
+        if progress is None:
+            progress = _read_progress(job["model_dir"])
+        status.update({"epoch": 0, "loss": None, "accuracy": None})
+        status.update(progress)
+        if status["status"] == "queued" and status["epoch"] > 0:
+            status["status"] = "running"
+        return status
+
+    def _finish(self, job_id, future):
+        job = self.jobs[job_id]
+        try:
+            self._complete(job_id, job, future)
+        finally:
+            # The artifacts were promoted (or are useless); keep only the progress
+            job["progress"] = _read_progress(job["model_dir"])
+            job["finished_at"] = datetime.datetime.utcnow().isoformat()
+            shutil.rmtree(job["model_dir"], ignore_errors=True)
+            self._prune()
+
+    def _complete(self, job_id, job, future):
+        if future.cancelled():
+            job["status"] = "cancelled"
+            return
+        error = future.exception()
+        if error is not None:
+            job["status"] = "failed"
+            job["error"] = str(error)
+            logger.error(f"Training job {job_id} failed: {str(error)}")
+            return
+
+        try:
+            self._promote(job["model_dir"])
+            if self.on_complete is not None:
+                self.on_complete(job)
+        except Exception as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+            logger.error(f"Failed to activate model from job {job_id}: {str(e)}")
+            return
+        job["status"] = "completed"
+        logger.info(f"Training job {job_id} completed and model activated")
+
+    def _prune(self):
+        with self._lock:
+            finished = [job_id for job_id, job in self.jobs.items() if job["progress"] is not None]
+            for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+                del self.jobs[job_id]
+
+    def _promote(self, job_dir):
+        # Copy next to the target, then rename, so restarts load a whole file
+        os.makedirs(self.model_dir, exist_ok=True)
+        for name in ARTIFACTS:
+            source = os.path.join(job_dir, name)
+            if not os.path.exists(source):
+                continue
+            target = os.path.join(self.model_dir, name)
+            shutil.copyfile(source, target + '.tmp')
+            os.replace(target + '.tmp', target)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,89 @@
+import collections
+import datetime
+import os
+import uuid
+
+CHAT_WINDOW_TURNS = int(os.getenv("CHAT_WINDOW_TURNS", "20"))
+
+
+class ChatTranscript:
+    """Chat history of one UI session with a bounded in-memory window.
+
+    Only the newest window_turns turns are kept in memory and rendered, so
+    a rerun costs the same however long the conversation gets. Every turn
+    is also queued on the ConversationWriter under this transcript's
+    session_id; turns that fall out of the window are paged back from the
+    conversations table on demand, one page at a time.
+    """
+
+    def __init__(self, writer, window_turns=CHAT_WINDOW_TURNS, session_factory=None):
+        self.writer = writer
+        self.window_turns = window_turns
+        self.session_factory = session_factory
+        self.clear()
+
+    def clear(self):
+        """Start a new conversation; earlier turns stay in the database."""
+        self.session_id = uuid.uuid4().hex
+        self.turns = collections.deque(maxlen=self.window_turns)
+        self.offloaded = 0
+        self.hide_earlier()
+
+    def add_turn(self, user_message, bot_response):
+        timestamp = datetime.datetime.utcnow()
+        if len(self.turns) == self.window_turns:
+            self.offloaded += 1
+        self.turns.append({"user": user_message, "assistant": bot_response, "timestamp": timestamp})
+        self.writer.submit(user_message, bot_response, session_id=self.session_id, timestamp=timestamp)
+
+    @staticmethod
+    def _as_messages(turns):
+        messages = []
+        for turn in turns:
+            messages.append({"role": "user", "content": turn["user"]})
+            messages.append({"role": "assistant", "content": turn["assistant"]})
+        return messages
+
+    def messages(self):
+        """Messages of the in-memory window, oldest first."""
+        return self._as_messages(self.turns)
+
+    def earlier_messages(self):
+        """Messages of the currently loaded page of older turns, oldest first."""
+        return self._as_messages(self.earlier)
+
+    def load_earlier(self):
+        """Replace the loaded page with the next older one.
+
+        The first call loads the turns just before the window; later calls
+        walk further back. Returns False once there is nothing older.
+        """
+        if not self.turns or (self.earlier and not self.has_more_earlier):
+            return False
+        from .history import fetch_conversations
+
+        if self.session_factory is None:
+            from .database import SessionLocal, init_db
+            init_db()
+            self.session_factory = SessionLocal
+
+        with self.session_factory() as db:
+            page, next_cursor = fetch_conversations(
+                db,
+                session_id=self.session_id,
+                limit=self.window_turns,
+                cursor=self._earlier_cursor,
+                before=self.turns[0]["timestamp"] if self._earlier_cursor is None else None,
+            )
+            self.earlier = [
+                {"user": row.user_input, "assistant": row.bot_response, "timestamp": row.timestamp}
+                for row in reversed(page)
+            ]
+        self._earlier_cursor = next_cursor
+        self.has_more_earlier = next_cursor is not None
+        return bool(self.earlier)
+
+    def hide_earlier(self):
+        self.earlier = []
+        self._earlier_cursor = None
+        self.has_more_earlier = False
@@ -0,0 +1,205 @@
+import datetime
+import hashlib
+import json
+import os
+import threading
+
+import numpy as np
+
+from .model import DATA_DIR
+
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR") or os.path.join(DATA_DIR, "vector_store")
+MANIFEST_FILE = "manifest.json"
+
+
+def document_hash(data):
+    """Content hash identifying an uploaded document, whatever its file name."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomic(path, write):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+class VectorStore:
+    """On-disk vector index of document chunks keyed by document content hash.
+
+    Each document is stored as its own segment: a .npy matrix of unit-length
+    chunk embeddings plus a .json list of the chunk texts. Adding or removing
+    a document writes or deletes its segment and rewrites the small
+    manifest, so nothing else is re-embedded or rewritten. Segments are
+    loaded with mmap, which keeps start-up cheap and lets every process
+    using the same directory share the pages through the OS cache.
+
+    Searches re-read the manifest when another process has changed it, so
+    all Streamlit sessions and workers pointing at one directory see the
+    same documents. Writes are serialized within a process; run ingestion
+    from one process at a time.
+    """
+
+    def __init__(self, path=VECTOR_STORE_DIR):
+        self.path = path
+        self._segments_dir = os.path.join(path, "segments")
+        os.makedirs(self._segments_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._manifest_version = None
+        self._manifest = {"dim": None, "documents": {}}
+        self._vectors = {}
+        self._texts = {}
+        self._refresh()
+
+    def __contains__(self, doc_hash):
+        self._refresh()
+        return doc_hash in self._manifest["documents"]
+
+    def __len__(self):
+        self._refresh()
+        return len(self._manifest["documents"])
+
+    @property
+    def dim(self):
+        return self._manifest["dim"]
+
+    def documents(self):
+        """Return [{"hash", "chunks", "added_at", "metadata"}] for every stored document."""
+        self._refresh()
+        return [
+            {"hash": doc_hash, **entry}
+            for doc_hash, entry in self._manifest["documents"].items()
+        ]
+
+    def add(self, doc_hash, chunks, vectors, metadata=None):
+        """Store a document's chunks and their embeddings.
+
+        Returns False without writing anything if the document is already
+        stored, so re-uploading a known file costs no embedding calls.
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(chunks):
+            raise ValueError("Expected one embedding row per chunk")
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            self._refresh()
+            if doc_hash in self._manifest["documents"]:
+                return False
+            dim = self._manifest["dim"]
+            if dim is not None and vectors.shape[1] != dim:
+                raise ValueError(f"Embedding size {vectors.shape[1]} does not match the store ({dim})")
+
+            base = os.path.join(self._segments_dir, doc_hash)
+            _write_atomic(f"{base}.json", lambda f: f.write(json.dumps(list(chunks)).encode("utf-8")))
+            _write_atomic(f"{base}.npy", lambda f: np.save(f, vectors))
+
+            manifest = {
+                "dim": vectors.shape[1],
+                "documents": {
+                    **self._manifest["documents"],
+                    doc_hash: {
+                        "chunks": len(chunks),
+                        "added_at": datetime.datetime.utcnow().isoformat(),
+                        "metadata": metadata or {},
+                    },
+                },
+            }
+            self._save_manifest(manifest)
+        return True
+
+    def remove(self, doc_hash):
+        """Drop a document and its segment files; returns False if it was not stored."""
+        with self._lock:
+            self._refresh()
+            if doc_hash not in self._manifest["documents"]:
+                return False
+            documents = dict(self._manifest["documents"])
+            del documents[doc_hash]
+            self._save_manifest({"dim": self._manifest["dim"] if documents else None,
+                                 "documents": documents})
+            for suffix in (".npy", ".json"):
+                try:
+                    os.remove(os.path.join(self._segments_dir, doc_hash + suffix))
+                except FileNotFoundError:
+                    pass
+        return True
+
+    def search(self, vector, k=4):
+        """Return up to k (score, text, metadata) tuples by cosine similarity."""
+        self._refresh()
+        documents = self._manifest["documents"]
+        query = np.asarray(vector, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm == 0 or not documents:
+            return []
+        query = query / norm
+
+        candidates = []
+        for doc_hash in documents:
+            segment = self._segment(doc_hash)
+            if segment is None:
+                continue
+            scores = segment @ query
+            top = min(k, len(scores))
+            for row in np.argpartition(-scores, top - 1)[:top]:
+                candidates.append((float(scores[row]), doc_hash, int(row)))
+        candidates.sort(key=lambda candidate: -candidate[0])
+
+        results = []
+        for score, doc_hash, row in candidates[:k]:
+            metadata = documents[doc_hash]["metadata"]
+            results.append((score, self._chunk_texts(doc_hash)[row], metadata))
+        return results
+
+    def _segment(self, doc_hash):
+        vectors = self._vectors.get(doc_hash)
+        if vectors is None:
+            try:
+                vectors = np.load(os.path.join(self._segments_dir, f"{doc_hash}.npy"), mmap_mode="r")
+            except FileNotFoundError:
+                return None
+            self._vectors[doc_hash] = vectors
+        return vectors
+
+    def _chunk_texts(self, doc_hash):
+        texts = self._texts.get(doc_hash)
+        if texts is None:
+            with open(os.path.join(self._segments_dir, f"{doc_hash}.json"), encoding="utf-8") as f:
+                texts = json.load(f)
+            self._texts[doc_hash] = texts
+        return texts
+
+    def _save_manifest(self, manifest):
+        path = os.path.join(self.path, MANIFEST_FILE)
+        _write_atomic(path, lambda f: f.write(json.dumps(manifest).encode("utf-8")))
+        self._manifest = manifest
+        self._manifest_version = self._version(path)
+        self._forget_removed()
+
+    def _refresh(self):
+        path = os.path.join(self.path, MANIFEST_FILE)
+        try:
+            version = self._version(path)
+        except FileNotFoundError:
+            return
+        if version == self._manifest_version:
+            return
+        with open(path, encoding="utf-8") as f:
+            self._manifest = json.load(f)
+        self._manifest_version = version
+        self._forget_removed()
+
+    @staticmethod
+    def _version(path):
+        # The manifest is replaced by rename, so a new inode means new contents
+        stat = os.stat(path)
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _forget_removed(self):
+        documents = self._manifest["documents"]
+        self._vectors = {h: v for h, v in self._vectors.items() if h in documents}
+        self._texts = {h: t for h, t in self._texts.items() if h in documents}
@@ -0,0 +1,119 @@
+"""Local stand-in for the OpenAI chat-completions API.
+
+Answers POST /v1/chat/completions (plain and streamed) after a configurable
+time-to-first-token, then emits tokens at a fixed rate. Used by the load
+tests and the backend test suite so nothing talks to the real API.
+
+    python -m benchmarks.fake_llm_server --port 9000 --latency 0.2 --tokens-per-second 50
+"""
+import argparse
+import asyncio
+import json
+import socket
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+
+def create_app(latency=0.05, tokens_per_second=0.0, response_tokens=20):
+    app = FastAPI(title="Fake LLM server")
+    app.state.requests = 0
+
+    def tokens_for(prompt):
+        words = [f"token{i}" for i in range(response_tokens)]
+        return [f"echo: {prompt}"] + [f" {word}" for word in words]
+
+    async def pace():
+        if tokens_per_second:
+            await asyncio.sleep(1.0 / tokens_per_second)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        prompt = body["messages"][-1]["content"]
+        tokens = tokens_for(prompt)
+        await asyncio.sleep(latency)
+
+        if not body.get("stream"):
+            for _ in tokens[1:]:
+                await pace()
+            return {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "model": body.get("model"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens)},
+                    "finish_reason": "stop",
+                }],
+            }
+
+        async def events():
+            for i, token in enumerate(tokens):
+                if i:
+                    await pace()
+                chunk = {"choices": [{"index": 0, "delta": {"content": token}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+class FakeLLMServer:
+    """Run the fake API on a background thread bound to a free local port."""
+
+    def __init__(self, **options):
+        self.app = create_app(**options)
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(("127.0.0.1", 0))
+        self.port = self._socket.getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{self.port}/v1"
+        self._server = uvicorn.Server(uvicorn.Config(self.app, log_level="warning"))
+        self._thread = threading.Thread(
+            target=self._server.run, kwargs={"sockets": [self._socket]}, daemon=True
+        )
+
+    @property
+    def request_count(self):
+        return self.app.state.requests
+
+    def start(self):
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Fake LLM server did not start")
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self._server.should_exit = True
+        self._thread.join(5)
+        self._socket.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--response-tokens", type=int, default=20)
+    args = parser.parse_args()
+    uvicorn.run(
+        create_app(args.latency, args.tokens_per_second, args.response_tokens),
+        host=args.host, port=args.port, log_level="warning",
+    )
@@ -0,0 +1,259 @@
+"""Load test the backend against the local fake LLM server.
+
+Starts the fake chat-completion server and a uvicorn worker running
+app.main, drives each endpoint at several concurrency levels and reports
+throughput plus p50/p95/p99 latency. Results are written as JSON so runs
+can be compared across commits.
+
+    cd backend
+    python -m benchmarks.loadtest --concurrency 1 10 50 --requests 200 --output bench.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from .fake_llm_server import FakeLLMServer
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_DATA_DIR = os.path.join(BACKEND_DIR, '..', 'data')
+
+
+def _request_factory(endpoint):
+    """Return a function building (method, path, json) for the i-th request."""
+    if endpoint == "chat":
+        # Distinct messages so every request reaches the upstream model
+        return lambda i: ("POST", "/chat", {"user_message": f"benchmark question {i}"})
+    if endpoint == "chat_stream":
+        return lambda i: ("POST", "/chat/stream", {"user_message": f"benchmark question {i}"})
+    if endpoint == "health":
+        return lambda i: ("GET", "/health", None)
+    if endpoint == "train":
+        # Each request queues a real training job, so this is never a default
+        return lambda i: ("POST", "/train", {"epochs": 1})
+    raise ValueError(f"Unknown endpoint: {endpoint}")
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+def summarize(endpoint, concurrency, latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    ms = [value * 1000 for value in latencies]
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 4),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else None,
+        "latency_ms": {
+            "mean": round(sum(ms) / len(ms), 3) if ms else None,
+            "p50": percentile(ms, 0.50),
+            "p95": percentile(ms, 0.95),
+            "p99": percentile(ms, 0.99),
+            "max": ms[-1] if ms else None,
+        },
+    }
+
+
+class _Connection:
+    """Minimal keep-alive HTTP/1.1 client used by the load generator.
+
+    httpx spends several times more CPU per request than the backend does
+    to serve /health, so on small machines it saturates before the server
+    and the numbers end up measuring the client. This reader only handles
+    what the backend sends: Content-Length and chunked bodies.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def request(self, method, path, body=None):
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b""
+        head = (
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+            f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n"
+        )
+        self._writer.write(head.encode() + payload)
+        await self._writer.drain()
+
+        status_line, *header_lines = (await self._reader.readuntil(b"\r\n\r\n")).decode("latin-1").split("\r\n")
+        headers = {}
+        for line in header_lines:
+            if line:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                await self._reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await self._reader.readexactly(int(headers.get("content-length", 0)))
+
+        if headers.get("connection") == "close":
+            await self.close()
+        return int(status_line.split()[1])
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+
+async def run_scenario(base_url, endpoint, concurrency, total_requests):
+    build = _request_factory(endpoint)
+    url = httpx.URL(base_url)
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal errors, next_index
+        connection = _Connection(url.host, url.port)
+        try:
+            while next_index < total_requests:
+                index = next_index
+                next_index += 1
+                method, path, body = build(index)
+                started = time.perf_counter()
+                try:
+                    ok = await connection.request(method, path, body) < 400
+                except (OSError, asyncio.IncompleteReadError, ValueError):
+                    await connection.close()
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+        finally:
+            await connection.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    return summarize(endpoint, concurrency, latencies, errors, elapsed)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_backend(llm_base_url, workdir, port, extra_env=None, workers=1):
+    data_dir = os.path.join(workdir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    shutil.copy(os.path.join(REPO_DATA_DIR, "intents.json"), data_dir)
+
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_BASE_URL": llm_base_url,
+        "OPENAI_API_KEY": "benchmark",
+        "DATA_DIR": data_dir,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "RESPONSE_CACHE_SIZE": "0",
+    })
+    env.update(extra_env or {})
+    if workers > 1:
+        # The opt-in multi-worker mode: preloaded gunicorn master
+        env.update({"BIND": f"127.0.0.1:{port}", "WEB_CONCURRENCY": str(workers)})
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+                   "--log-level", "warning", "app.main:app"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                   "--port", str(port), "--log-level", "warning"]
+    process = subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Backend exited during startup")
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=1.0).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("Backend did not become ready")
+
+
+async def run_all(base_url, endpoints, levels, total_requests):
+    results = []
+    for endpoint in endpoints:
+        for concurrency in levels:
+            result = await run_scenario(base_url, endpoint, concurrency, total_requests)
+            latency = result["latency_ms"]
+            print(
+                f"{endpoint:<12} c={concurrency:<4} {result['throughput_rps'] or 0:>9.1f} req/s  "
+                f"p50={latency['p50'] or 0:>8.1f}ms  p95={latency['p95'] or 0:>8.1f}ms  "
+                f"p99={latency['p99'] or 0:>8.1f}ms  errors={result['errors']}"
+            )
+            results.append(result)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the chatbot backend")
+    parser.add_argument("--endpoints", nargs="+", default=["health", "chat", "chat_stream"],
+                        choices=["health", "chat", "chat_stream", "train"],
+                        help="train starts a real training job per request; only pass it explicitly")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 10, 50, 100])
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--llm-tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="serve with gunicorn and this many workers when above 1")
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="villie-bench-")
+    fake = FakeLLMServer(latency=args.llm_latency, tokens_per_second=args.llm_tokens_per_second)
+    with fake:
+        process, base_url = start_backend(fake.base_url, workdir, _free_port(), workers=args.workers)
+        try:
+            results = asyncio.run(run_all(base_url, args.endpoints, args.concurrency, args.requests))
+        finally:
+            process.terminate()
+            process.wait(10)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created_at": datetime.datetime.utcnow().isoformat(),
+        "config": vars(args),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -9,5 +9,6 @@ else:
     ssl._create_default_https_context = _create_unverified_https_context
 
 nltk.download('punkt')
+nltk.download('punkt_tab')  # Required by word_tokenize in nltk>=3.9
 nltk.download('wordnet')
 nltk.download('omw-1.4')  # Open Multilingual Wordnet
\ No newline at end of file
@@ -0,0 +1,56 @@
+"""Gunicorn settings for serving the API.
+
+    gunicorn -c gunicorn.conf.py app.main:app
+
+One worker by default. WEB_CONCURRENCY=N opts into N workers; training
+jobs, the model hot swap, /stats, the in-memory response cache and
+conversation memory are then per worker (see the README).
+
+The master imports the app and builds the chatbot engine once
+(app.main.preload) before forking, so workers share its memory
+copy-on-write. Each worker then runs its own event loop, LLM connection
+pool and write-behind thread; SQLite writes from different workers are
+serialized with BEGIN IMMEDIATE and busy_timeout (see app/database.py).
+Workers record metrics in PROMETHEUS_MULTIPROC_DIR so that /metrics on
+any worker reports all of them (see app/metrics.py).
+"""
+import glob
+import os
+import sys
+import tempfile
+
+# Must be set before prometheus_client is imported, i.e. before the app
+metrics_dir = os.environ.setdefault(
+    "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "villie-metrics")
+)
+os.makedirs(metrics_dir, exist_ok=True)
+# Samples from a previous server would otherwise be added to this one's
+for path in glob.glob(os.path.join(metrics_dir, "*.db")):
+    os.remove(path)
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY") or 1)
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+keepalive = 5
+graceful_timeout = 30
+
+
+def when_ready(server):
+    from app.main import preload
+
+    preload()
+
+
+def post_fork(server, worker):
+    # Pooled connections must never be shared across a fork
+    database = sys.modules.get("app.database")
+    if database is not None:
+        database.engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    # Drop the live gauges (in-flight requests, queue depths) of a dead worker
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
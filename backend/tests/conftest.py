@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import llm_client
+from app.database import Base
+from benchmarks.fake_llm_server import FakeLLMServer
+
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_llm_server():
+    """Point the shared LLM client at a local fake instead of the real API."""
+    monkeypatch = pytest.MonkeyPatch()
+    server = FakeLLMServer(latency=0.0).start()
+    monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setattr(llm_client, "_client", None)
+    try:
+        yield server
+    finally:
+        monkeypatch.undo()
+        server.stop()
+
+
+@pytest.fixture(autouse=True)
+def fresh_llm_client(monkeypatch):
+    # Each TestClient runs its own event loop; don't share pooled connections
+    monkeypatch.setattr(llm_client, "_client", None)
+
+
+@pytest.fixture
+def session_factory():
+    """Session factory over a fresh in-memory conversations database."""
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -0,0 +1,84 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+from prometheus_client import REGISTRY
+
+from app.admission import AdmissionMiddleware, TokenBuckets
+from app.metrics import MetricsMiddleware
+
+
+def make_app(delay=0.1, **options):
+    app = FastAPI()
+
+    @app.post("/chat")
+    async def chat():
+        await asyncio.sleep(delay)
+        return {"bot_response": "ok"}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    app.add_middleware(AdmissionMiddleware, **options)
+    return app
+
+
+async def post_many(app, count, **kwargs):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await asyncio.gather(*[client.post("/chat", **kwargs) for _ in range(count)])
+
+
+def test_overflow_beyond_slots_and_queue_is_rejected_fast():
+    app = make_app(delay=0.2, max_in_flight=2, max_queue=2, queue_timeout=5.0)
+    responses = asyncio.run(post_many(app, 10))
+
+    statuses = sorted(response.status_code for response in responses)
+    # Two served at once, two more after waiting, the rest turned away
+    assert statuses == [200] * 4 + [503] * 6
+    rejected = [r for r in responses if r.status_code == 503]
+    assert all(r.headers["retry-after"] == "5" for r in rejected)
+    assert rejected[0].json() == {"detail": "Server is overloaded"}
+
+
+def test_queued_requests_time_out_with_503():
+    app = make_app(delay=0.5, max_in_flight=1, max_queue=10, queue_timeout=0.05)
+    statuses = [r.status_code for r in asyncio.run(post_many(app, 3))]
+    assert sorted(statuses) == [200, 503, 503]
+
+
+def test_token_bucket_limits_each_client():
+    buckets = TokenBuckets(rate=2.0, burst=2)
+    assert buckets.take("a", now=0.0) == 0
+    assert buckets.take("a", now=0.0) == 0
+    assert buckets.take("a", now=0.0) == 0.5
+    assert buckets.take("b", now=0.0) == 0
+    # Half a second refills one token
+    assert buckets.take("a", now=0.5) == 0
+
+    app = make_app(delay=0.0, rate=1.0, burst=2, client_header="x-client-id")
+    responses = asyncio.run(post_many(app, 4, headers={"X-Client-Id": "alice"}))
+    statuses = [r.status_code for r in responses]
+    assert statuses.count(200) == 2 and statuses.count(429) == 2
+    assert {r.headers["retry-after"] for r in responses if r.status_code == 429} == {"1"}
+    assert asyncio.run(post_many(app, 1, headers={"X-Client-Id": "bob"}))[0].status_code == 200
+
+
+def test_other_paths_bypass_admission_and_rejections_keep_route_label():
+    app = make_app(delay=0.2, max_in_flight=1, max_queue=0)
+    app.add_middleware(MetricsMiddleware)
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            slow = asyncio.ensure_future(client.post("/chat"))
+            await asyncio.sleep(0.05)
+            rejected = await client.post("/chat")
+            health = await client.get("/health")
+            return (await slow).status_code, rejected.status_code, health.status_code
+
+    assert asyncio.run(run()) == (200, 503, 200)
+    assert REGISTRY.get_sample_value(
+        "http_requests_total", {"method": "POST", "route": "/chat", "status": "503"}
+    ) >= 1
@@ -0,0 +1,88 @@
+from app.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_opens_on_failure_rate_and_recovers_through_one_probe():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_rate=0.5, window=10, min_calls=4, open_seconds=30, clock=clock)
+
+    for ok in (True, False, True):
+        permit = breaker.allow()
+        assert permit
+        breaker.record(permit, ok)
+    assert breaker.state == CLOSED
+    breaker.record(breaker.allow(), False)
+    assert breaker.state == OPEN
+    assert breaker.allow() is None
+    assert breaker.retry_after() == 30
+
+    clock.now = 30
+    probe = breaker.allow()
+    assert probe
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time; a failed probe opens the circuit again
+    assert breaker.allow() is None
+    breaker.record(probe, False)
+    assert breaker.state == OPEN and breaker.trips == 2
+
+    clock.now = 60
+    breaker.record(breaker.allow(), True)
+    assert breaker.state == CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_slow_calls_count_as_failures_and_abandoned_probes_are_released():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_rate=0.5, slow_call_seconds=2.0, min_calls=2, clock=clock)
+    breaker.record(breaker.allow(), True, seconds=5.0)
+    breaker.record(breaker.allow(), True, seconds=3.0)
+    assert breaker.state == OPEN
+
+    clock.now = 100
+    breaker.release(breaker.allow())
+    assert breaker.allow()
+
+
+def test_calls_in_flight_when_the_circuit_opens_do_not_count():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_rate=0.5, window=20, min_calls=4, open_seconds=30, clock=clock)
+
+    permits = [breaker.allow() for _ in range(16)]
+    for permit in permits[:4]:
+        breaker.record(permit, False)
+    assert breaker.state == OPEN and breaker.trips == 1
+
+    # The other twelve fail after the trip: no further trips, same timer
+    clock.now = 10
+    for permit in permits[4:]:
+        breaker.record(permit, False)
+    assert breaker.trips == 1
+    assert breaker.retry_after() == 20
+
+
+def test_only_the_probe_decides_a_half_open_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker(min_calls=2, open_seconds=30, clock=clock)
+
+    old = breaker.allow()
+    breaker.record(breaker.allow(), False)
+    breaker.record(breaker.allow(), False)
+    assert breaker.state == OPEN
+
+    clock.now = 30
+    probe = breaker.allow()
+    # A late success from before the trip neither closes the circuit nor frees the probe slot
+    breaker.record(old, True)
+    breaker.release(old)
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow() is None
+
+    breaker.record(probe, True)
+    assert breaker.state == CLOSED
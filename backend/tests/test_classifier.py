@@ -0,0 +1,102 @@
+import pickle
+
+import numpy as np
+
+from app.model.classifier import IntentClassifier
+from app.model.features import bag_of_words, build_word_index
+
+
+def make_classifier():
+    words = ["bye", "hello", "hi", "thanks"]
+    classes = ["goodbye", "greeting", "thanks"]
+    rng = np.random.default_rng(0)
+    layers = [
+        (rng.normal(size=(4, 8)), rng.normal(size=8)),
+        (rng.normal(size=(8, 6)), rng.normal(size=6)),
+        (rng.normal(size=(6, 3)), rng.normal(size=3)),
+    ]
+    return IntentClassifier(words, classes, layers), layers
+
+
+def reference_forward(bag, layers):
+    x = bag
+    for i, (kernel, bias) in enumerate(layers):
+        x = x @ kernel + bias
+        if i < len(layers) - 1:
+            x = np.maximum(x, 0)
+    e = np.exp(x - x.max())
+    return e / e.sum()
+
+
+def test_predict_proba_matches_reference_forward_pass():
+    classifier, layers = make_classifier()
+    token_lists = [["hello", "unknown"], ["bye"], [], ["hi", "thanks", "hi"]]
+
+    probs = classifier.predict_proba(token_lists)
+
+    assert probs.shape == (4, 3)
+    assert np.allclose(probs.sum(axis=1), 1.0)
+    for row, tokens in enumerate(token_lists):
+        bag = np.array([1.0 if word in tokens else 0.0 for word in classifier.words])
+        assert np.allclose(probs[row], reference_forward(bag, layers), atol=1e-5)
+
+
+def test_load_round_trip(tmp_path):
+    classifier, layers = make_classifier()
+    with open(tmp_path / "words.pkl", "wb") as f:
+        pickle.dump(classifier.words, f)
+    with open(tmp_path / "classes.pkl", "wb") as f:
+        pickle.dump(classifier.classes, f)
+    np.savez(tmp_path / "chatbot_weights.npz", *[w for layer in layers for w in layer])
+
+    assert IntentClassifier.exists(tmp_path)
+    loaded = IntentClassifier.load(tmp_path)
+    assert loaded.classes == classifier.classes
+    assert np.allclose(loaded.predict_proba([["hi"]]), classifier.predict_proba([["hi"]]))
+
+
+def test_bag_of_words_compact_dtype_ignores_unknown_tokens():
+    word_index = build_word_index(["bye", "hello", "hi"])
+    bags = bag_of_words([["hi", "hi", "nope"], [], ["bye", "hello"]], word_index, dtype=np.uint8)
+
+    assert bags.dtype == np.uint8
+    assert bags.tolist() == [[0, 0, 1], [0, 0, 0], [1, 1, 0]]
+
+
+def test_engine_classifies_degraded_batch_in_one_pass():
+    from app.model.chatbot_engine import FALLBACK_RESPONSE, ChatbotEngine, IntentModel
+
+    class RecordingClassifier:
+        def __init__(self):
+            self.batches = []
+
+        def predict(self, messages):
+            self.batches.append(list(messages))
+            return [("thanks", 0.9) if "grateful" in m else ("thanks", 0.1) for m in messages]
+
+    engine = ChatbotEngine()
+    classifier = RecordingClassifier()
+    engine.intent_model = IntentModel(engine.load_intents(), classifier)
+    messages = ["so grateful", "zzz qqq", "also grateful"]
+    responses = engine.degraded_responses(messages)
+
+    assert classifier.batches == [messages]
+    thanks = engine.intent_model.intents_by_tag["thanks"]["responses"]
+    assert responses[0] in thanks and responses[2] in thanks
+    assert responses[1] == FALLBACK_RESPONSE
+
+
+def test_reload_classifier_swaps_intents_matcher_and_model_together(tmp_path):
+    from app.model.chatbot_engine import ChatbotEngine
+    from test_training import fake_training_job
+
+    fake_training_job(str(tmp_path), 1)
+    engine = ChatbotEngine()
+    before = engine.intent_model
+    engine.reload_classifier(str(tmp_path))
+
+    after = engine.intent_model
+    assert after is not before
+    assert after.matcher is not before.matcher and after.intents is not before.intents
+    assert after.classifier.classes == ["greeting"]
+    assert engine.match_intent("Hello") in after.intents_by_tag["greeting"]["responses"]
@@ -0,0 +1,83 @@
+import time
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.conversation_writer import ConversationWriter
+from app.database import Base, Conversation
+
+
+def make_session_factory():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+
+def count_rows(session_factory):
+    with session_factory() as db:
+        return db.scalar(select(func.count()).select_from(Conversation))
+
+
+def test_stop_drains_queued_rows_in_batches():
+    session_factory = make_session_factory()
+    writer = ConversationWriter(session_factory, batch_size=50, flush_interval=10.0)
+
+    for i in range(120):
+        writer.submit(f"question {i}", f"answer {i}")
+    writer.stop()
+
+    assert count_rows(session_factory) == 120
+    assert writer.rows_written == 120
+    assert writer.batches_flushed == 3
+    assert writer.depth == 0
+
+
+def test_rows_flush_after_interval():
+    session_factory = make_session_factory()
+    writer = ConversationWriter(session_factory, batch_size=1000, flush_interval=0.05)
+    writer.submit("hello", "hi there")
+
+    for _ in range(100):
+        if writer.rows_written:
+            break
+        time.sleep(0.01)
+    writer.stop()
+
+    assert count_rows(session_factory) == 1
+    assert writer.stats()["last_flush_seconds"] > 0
+
+
+def test_concurrent_write_batches_keep_exact_counters():
+    import threading
+
+    class NullSession:
+        def execute(self, *args):
+            pass
+
+        def commit(self):
+            pass
+
+        def rollback(self):
+            pass
+
+        def close(self):
+            pass
+
+    writer = ConversationWriter(NullSession)
+
+    def write():
+        for _ in range(500):
+            writer.write_batch([{"user_input": "hi", "bot_response": "hello"}])
+
+    threads = [threading.Thread(target=write) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = writer.stats()
+    assert stats["rows_written"] == stats["batches_flushed"] == 4000
+    assert stats["rows_dropped"] == 0
@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine, insert, inspect
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from app.database import Conversation, content_hash, find_conversations_by_input
+
+EXPECTED_INDEXES = {
+    "ix_conversations_user_input_hash",
+    "ix_conversations_timestamp_id",
+    "ix_conversations_session_timestamp_id",
+    "ix_conversations_user_timestamp_id",
+}
+
+
+def test_content_hash_is_stable_signed_64_bit():
+    value = content_hash("Hello")
+    assert value == content_hash("Hello")
+    assert value != content_hash("hello")
+    assert -2**63 <= value < 2**63
+
+
+def test_inserts_fill_hash_and_lookup_uses_it(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'chat.db'}")
+    database.Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+
+    with Session() as db:
+        db.execute(insert(Conversation), [
+            {"user_input": "hi", "bot_response": "hello"},
+            {"user_input": "bye", "bot_response": "goodbye"},
+            {"user_input": "hi", "bot_response": "hey"},
+        ])
+        db.commit()
+        matches = find_conversations_by_input(db, "hi")
+
+    assert [c.bot_response for c in matches] == ["hey", "hello"]
+    assert all(c.user_input_hash == content_hash("hi") for c in matches)
+    indexes = {index["name"] for index in inspect(engine).get_indexes("conversations")}
+    assert indexes == EXPECTED_INDEXES
+
+
+def test_init_db_migrates_legacy_schema(tmp_path, monkeypatch):
+    path = tmp_path / "legacy.db"
+    legacy = sqlite3.connect(path)
+    legacy.executescript("""
+        CREATE TABLE conversations (
+            id INTEGER PRIMARY KEY, user_input VARCHAR, bot_response VARCHAR, timestamp DATETIME
+        );
+        CREATE INDEX ix_conversations_user_input ON conversations (user_input);
+        INSERT INTO conversations (user_input, bot_response) VALUES ('hi', 'hello');
+    """)
+    legacy.close()
+
+    engine = create_engine(f"sqlite:///{path}")
+    monkeypatch.setattr(database, "engine", engine)
+    monkeypatch.setattr(database, "_initialized", False)
+    database.init_db()
+
+    indexes = {index["name"] for index in inspect(engine).get_indexes("conversations")}
+    assert indexes == EXPECTED_INDEXES
+    with sessionmaker(bind=engine)() as db:
+        assert [c.bot_response for c in find_conversations_by_input(db, "hi")] == ["hello"]
+
+
+def test_write_sessions_take_the_lock_at_begin(tmp_path):
+    path = tmp_path / "chat.db"
+    engine = create_engine(f"sqlite:///{path}")
+    database.configure_sqlite(engine)
+    database.Base.metadata.create_all(bind=engine)
+    other = sqlite3.connect(path, timeout=0, isolation_level=None)
+
+    # A plain session only reads, so another process can still write
+    with sessionmaker(bind=engine)() as db:
+        find_conversations_by_input(db, "hi")
+        other.execute("INSERT INTO conversations (user_input) VALUES ('other')")
+
+    write_engine = engine.execution_options(sqlite_begin="IMMEDIATE")
+    with sessionmaker(bind=write_engine)() as db:
+        find_conversations_by_input(db, "hi")
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            other.execute("INSERT INTO conversations (user_input) VALUES ('blocked')")
+        db.execute(insert(Conversation), [{"user_input": "hi", "bot_response": "hello"}])
+        db.commit()
+
+    other.execute("INSERT INTO conversations (user_input) VALUES ('after')")
+    other.close()
+    with sessionmaker(bind=engine)() as db:
+        assert [c.bot_response for c in find_conversations_by_input(db, "hi")] == ["hello"]
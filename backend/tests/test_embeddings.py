@@ -0,0 +1,85 @@
+import json
+import threading
+
+import httpx
+import numpy as np
+import pytest
+
+from app.embeddings import EmbeddingCache, EmbeddingPipeline, HashingEmbedder, OpenAIEmbedder
+
+
+class CountingEmbedder:
+    name = "counting"
+
+    def __init__(self, failures=0):
+        self.calls = []
+        self.failures = failures
+        self._lock = threading.Lock()
+
+    def embed(self, texts):
+        with self._lock:
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("rate limited")
+            self.calls.append(list(texts))
+        return np.asarray([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_duplicates_are_embedded_once_and_cached_across_runs(tmp_path):
+    embedder = CountingEmbedder()
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"))
+    pipeline = EmbeddingPipeline(embedder, cache=cache, batch_size=2, max_workers=2)
+
+    vectors = pipeline.embed(["a", "bb", "a", "ccc", "dddd"])
+    assert vectors.tolist() == [[1, 1], [2, 1], [1, 1], [3, 1], [4, 1]]
+    assert sorted(len(batch) for batch in embedder.calls) == [2, 2]
+
+    # A new pipeline over the same cache file only embeds the unseen chunk
+    embedder.calls.clear()
+    again = EmbeddingPipeline(embedder, cache=EmbeddingCache(str(tmp_path / "embeddings.db")))
+    assert again.embed(["bb", "eeeee"]).tolist() == [[2, 1], [5, 1]]
+    assert embedder.calls == [["eeeee"]]
+    assert again.stats() == {"hits": 1, "misses": 1, "batches": 1}
+
+
+def test_failed_cache_write_is_rolled_back(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.db"))
+    with pytest.raises(Exception):
+        # The second key cannot be bound, so the insert fails inside the transaction
+        cache.set_many([("a", [1.0]), (object(), [2.0])])
+    assert cache.get_many(["a"]) == {}
+
+    cache.set_many([("b", [3.0])])
+    assert cache.get_many(["b"])["b"].tolist() == [3.0]
+
+
+def test_failed_batches_are_retried():
+    embedder = CountingEmbedder(failures=2)
+    pipeline = EmbeddingPipeline(embedder, retries=2, backoff=0.0)
+    assert pipeline.embed_query("hi") == [2.0, 1.0]
+
+    with pytest.raises(RuntimeError):
+        EmbeddingPipeline(CountingEmbedder(failures=5), retries=1, backoff=0.0).embed(["x"])
+
+
+def test_hashing_embedder_is_deterministic_and_similarity_aware():
+    embedder = HashingEmbedder(dim=256)
+    vectors = embedder.embed(["The cat sat on the mat", "the cat sat on a mat", "stock prices fell", ""])
+    assert np.allclose(vectors, embedder.embed(["The cat sat on the mat", "the cat sat on a mat",
+                                                "stock prices fell", ""]))
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    assert not vectors[3].any()
+
+
+def test_openai_embedder_orders_results_by_index():
+    def handler(request):
+        body = json.loads(request.content)
+        data = [{"index": i, "embedding": [float(len(text))]} for i, text in enumerate(body["input"])]
+        return httpx.Response(200, json={"data": list(reversed(data))})
+
+    embedder = OpenAIEmbedder(api_key="test", transport=httpx.MockTransport(handler))
+    try:
+        assert embedder.embed(["a", "bbb"]).tolist() == [[1.0], [3.0]]
+    finally:
+        embedder.close()
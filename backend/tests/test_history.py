@@ -0,0 +1,51 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base, Conversation
+from app.history import InvalidCursor, fetch_conversations
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'history.db'}")
+    Base.metadata.create_all(bind=engine)
+    start = datetime.datetime(2025, 1, 1)
+    rows = []
+    for i in range(25):
+        rows.append({
+            "user_input": f"q{i}",
+            "bot_response": f"a{i}",
+            # Pairs of rows share a timestamp so ties are broken by id
+            "timestamp": start + datetime.timedelta(seconds=i // 2),
+            "session_id": "s1" if i % 2 == 0 else "s2",
+        })
+    with sessionmaker(bind=engine)() as session:
+        session.execute(insert(Conversation), rows)
+        session.commit()
+        yield session
+
+
+def collect(db, **filters):
+    seen = []
+    cursor = None
+    while True:
+        page, cursor = fetch_conversations(db, limit=4, cursor=cursor, **filters)
+        seen.extend(c.user_input for c in page)
+        if cursor is None:
+            return seen
+
+
+def test_pages_cover_every_row_newest_first_without_duplicates(db):
+    assert collect(db) == [f"q{i}" for i in reversed(range(25))]
+
+
+def test_filter_by_session(db):
+    assert collect(db, session_id="s2") == [f"q{i}" for i in reversed(range(1, 25, 2))]
+
+
+def test_invalid_cursor(db):
+    with pytest.raises(InvalidCursor):
+        fetch_conversations(db, cursor="not-a-cursor")
@@ -0,0 +1,63 @@
+import json
+import os
+import random
+
+from app.model.intent_matcher import IntentMatcher
+
+INTENTS_PATH = os.path.join(os.path.dirname(__file__), '../../data/intents.json')
+
+
+def naive_match(intents, message):
+    for index, intent in enumerate(intents):
+        if any(pattern.lower() in message.lower() for pattern in intent['patterns']):
+            return index
+    return None
+
+
+def test_matches_original_loop_on_intents_json():
+    with open(INTENTS_PATH) as file:
+        intents = json.load(file)['intents']
+    matcher = IntentMatcher(intents)
+    patterns = [p for intent in intents for p in intent['patterns']]
+
+    rng = random.Random(0)
+    messages = ["", "nothing relevant here", "THANK YOU so much", "well, hello there"]
+    for _ in range(300):
+        words = rng.sample(patterns, 2) + ["filler", "text"]
+        rng.shuffle(words)
+        messages.append(" ".join(words))
+    for message in messages:
+        assert matcher.match_index(message) == naive_match(intents, message), message
+
+
+def test_first_intent_wins_over_earlier_position():
+    intents = [
+        {"tag": "late", "patterns": ["world"]},
+        {"tag": "early", "patterns": ["hello"]},
+    ]
+    matcher = IntentMatcher(intents)
+    assert matcher.match("hello world")["tag"] == "late"
+    assert matcher.match("nothing") is None
+
+
+def test_overlapping_patterns_via_fail_links():
+    intents = [
+        {"tag": "a", "patterns": ["she"]},
+        {"tag": "b", "patterns": ["he"]},
+        {"tag": "c", "patterns": ["hers"]},
+    ]
+    matcher = IntentMatcher(intents)
+    assert matcher.match("ushers")["tag"] == "a"
+    assert matcher.match("uhers")["tag"] == "b"
+    assert IntentMatcher(intents[2:]).match("ushers")["tag"] == "c"
+
+
+def test_word_boundary_mode():
+    intents = [{"tag": "greeting", "patterns": ["Hi", "Can you help me?"]}]
+    loose = IntentMatcher(intents)
+    strict = IntentMatcher(intents, word_boundary=True)
+
+    assert loose.match("this is it") is not None
+    assert strict.match("this is it") is None
+    assert strict.match("oh hi!") is not None
+    assert strict.match("so, can you help me?!") is not None
@@ -0,0 +1,63 @@
+from app.model.knowledge_base import DEFAULT_KNOWLEDGE_FILES, KnowledgeBase, flatten_json, load_passages
+
+CONFIG = {
+    "chatbot_types": {
+        "rule_based": {
+            "description": "Pattern matching and predefined responses",
+            "pros": ["Easy to build", "Predictable responses"],
+        },
+        "generative_based": {
+            "description": "Generates new text with a language model",
+            "pros": ["Flexible", "Handles open questions"],
+        },
+    },
+    "security_best_practices": ["Rate limiting", "Input validation"],
+}
+
+
+def test_flatten_json_titles_passages_by_path():
+    passages = dict(flatten_json(CONFIG))
+    assert passages["Chatbot types > Rule based"] == (
+        "Description: Pattern matching and predefined responses\n"
+        "Pros: Easy to build, Predictable responses"
+    )
+    assert passages["Overview"] == "Security best practices: Rate limiting, Input validation"
+
+
+def test_answer_returns_confident_matches_only():
+    kb = KnowledgeBase(flatten_json(CONFIG), min_coverage=0.75, min_score=0)
+    assert kb.answer("What are the pros of rule based chatbots?").startswith("Chatbot types > Rule based")
+    assert kb.search("generative language model")[0][2] == "Chatbot types > Generative based"
+    assert kb.answer("how do I bake sourdough bread") is None
+    assert kb.answer("hello") is None
+    # A single matching term covers a one-term query completely
+    assert kb.answer("what are the pros") is None
+
+
+def test_text_files_are_split_into_paragraphs(tmp_path):
+    path = tmp_path / "deployment_notes.txt"
+    path.write_text("Use gunicorn with uvicorn workers.\n\nBack up the SQLite file nightly.\n")
+    passages = load_passages(str(path))
+    assert passages == [
+        ("Deployment notes", "Use gunicorn with uvicorn workers."),
+        ("Deployment notes", "Back up the SQLite file nightly."),
+    ]
+    kb = KnowledgeBase.load([str(path)], min_coverage=0.5, min_score=0, min_heading_terms=0)
+    assert kb.answer("how should I back up sqlite") == "Deployment notes\nBack up the SQLite file nightly."
+
+
+def test_generic_questions_are_not_answered_from_the_bundled_config():
+    kb = KnowledgeBase.load(DEFAULT_KNOWLEDGE_FILES)
+    assert kb.answer("What are the pros of rule based chatbots?").startswith("Chatbot types > Rule based")
+    for query in [
+        "is it free",
+        "pros and cons",
+        "how do I install it",
+        "what is python",
+        "What is GPT-4?",
+        "what are your features",
+        # Only a parent section or body text matches, not the passage's own heading
+        "What is natural language processing?",
+        "how to deploy a model to production",
+    ]:
+        assert kb.answer(query) is None, query
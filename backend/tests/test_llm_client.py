@@ -0,0 +1,229 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+from app.circuit_breaker import CircuitBreaker
+from app.llm_client import CircuitOpenError, LLMClient, LLMError
+
+
+def make_transport(delay=0.0, status_code=200, tracker=None):
+    async def handler(request):
+        if tracker is not None:
+            tracker["current"] += 1
+            tracker["peak"] = max(tracker["peak"], tracker["current"])
+        await asyncio.sleep(delay)
+        if tracker is not None:
+            tracker["current"] -= 1
+        body = json.loads(request.content)
+        content = f"echo: {body['messages'][-1]['content']}"
+        return httpx.Response(status_code, json={"choices": [{"message": {"content": content}}]})
+    return httpx.MockTransport(handler)
+
+
+def test_complete_returns_message_content():
+    async def run():
+        client = LLMClient(api_key="test", transport=make_transport())
+        try:
+            return await client.complete([{"role": "user", "content": "hi"}])
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == "echo: hi"
+
+
+def test_concurrent_completions_overlap_and_respect_cap():
+    tracker = {"current": 0, "peak": 0}
+
+    async def run():
+        client = LLMClient(api_key="test", max_concurrency=20,
+                           transport=make_transport(delay=0.1, tracker=tracker))
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(*[
+                client.complete([{"role": "user", "content": str(i)}]) for i in range(100)
+            ])
+            return time.perf_counter() - start
+        finally:
+            await client.aclose()
+
+    elapsed = asyncio.run(run())
+    assert tracker["peak"] == 20
+    # 100 calls at 0.1s each with a cap of 20 should take ~5 rounds, not 100
+    assert elapsed < 2.0
+
+
+def test_timeout_raises_llm_error():
+    async def run():
+        client = LLMClient(api_key="test", timeout=0.05, transport=make_transport(delay=1.0))
+        try:
+            await client.complete([{"role": "user", "content": "slow"}])
+        finally:
+            await client.aclose()
+
+    with pytest.raises(LLMError):
+        asyncio.run(run())
+
+
+def test_upstream_error_raises_llm_error():
+    async def run():
+        client = LLMClient(api_key="test", transport=make_transport(status_code=500))
+        try:
+            await client.complete([{"role": "user", "content": "boom"}])
+        finally:
+            await client.aclose()
+
+    with pytest.raises(LLMError):
+        asyncio.run(run())
+
+
+def test_stream_yields_deltas_in_order():
+    chunks = ["Hel", "lo", " there"]
+
+    def handler(request):
+        assert json.loads(request.content)["stream"] is True
+        body = "".join(
+            f"data: {json.dumps({'choices': [{'delta': {'content': c}}]})}\n\n" for c in chunks
+        ) + "data: [DONE]\n\n"
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+    async def run():
+        client = LLMClient(api_key="test", transport=httpx.MockTransport(handler))
+        try:
+            return [delta async for delta in client.stream([{"role": "user", "content": "hi"}])]
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == chunks
+
+
+def counting_transport(delay, calls):
+    async def handler(request):
+        content = json.loads(request.content)["messages"][-1]["content"]
+        calls.append(content)
+        number = len(calls)
+        await asyncio.sleep(delay)
+        if content == "fail":
+            return httpx.Response(500)
+        return httpx.Response(200, json={"choices": [{"message": {"content": f"#{number}"}}]})
+    return httpx.MockTransport(handler)
+
+
+def test_identical_in_flight_completions_share_one_call():
+    calls = []
+
+    async def run():
+        client = LLMClient(api_key="test", coalesce=True, transport=counting_transport(0.05, calls))
+        try:
+            burst = [client.complete([{"role": "user", "content": text}])
+                     for text in ["Hello", "hello ", "HELLO", "other"]]
+            answers = await asyncio.gather(*burst)
+            # Once the burst is over the next call goes upstream again
+            later = await client.complete([{"role": "user", "content": "hello"}])
+            return answers, later, client.coalesced
+        finally:
+            await client.aclose()
+
+    answers, later, coalesced = asyncio.run(run())
+    assert answers[:3] == [answers[0]] * 3
+    assert answers[3] != answers[0]
+    assert later not in answers
+    assert coalesced == 2
+    assert sorted(calls) == ["Hello", "hello", "other"]
+
+
+def test_coalesced_followers_survive_leader_cancellation_and_share_errors():
+    calls = []
+
+    async def run():
+        client = LLMClient(api_key="test", coalesce=True, transport=counting_transport(0.05, calls))
+        try:
+            leader = asyncio.ensure_future(client.complete([{"role": "user", "content": "hi"}]))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(client.complete([{"role": "user", "content": "hi"}]))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            answer = await follower
+
+            failures = await asyncio.gather(
+                *[client.complete([{"role": "user", "content": "fail"}]) for _ in range(3)],
+                return_exceptions=True,
+            )
+            return answer, failures
+        finally:
+            await client.aclose()
+
+    answer, failures = asyncio.run(run())
+    assert answer == "#1"
+    assert all(isinstance(failure, LLMError) for failure in failures)
+    assert calls == ["hi", "fail"]
+
+
+def test_open_circuit_fails_fast_without_calling_upstream():
+    calls = []
+
+    async def run():
+        breaker = CircuitBreaker(min_calls=2, open_seconds=60)
+        client = LLMClient(api_key="test", coalesce=False, breaker=breaker,
+                           transport=counting_transport(0.0, calls))
+        try:
+            for _ in range(2):
+                with pytest.raises(LLMError):
+                    await client.complete([{"role": "user", "content": "fail"}])
+            with pytest.raises(CircuitOpenError):
+                await client.complete([{"role": "user", "content": "hi"}])
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+    assert calls == ["fail", "fail"]
+
+
+def test_chat_deadline_expiries_open_the_circuit_without_coalescing(monkeypatch):
+    from app import llm_client
+    from app.model.chatbot_engine import ChatbotEngine
+
+    calls = []
+    breaker = CircuitBreaker(slow_call_seconds=0.05, min_calls=2, open_seconds=60)
+    client = LLMClient(api_key="test", coalesce=False, breaker=breaker,
+                       transport=counting_transport(1.0, calls))
+    monkeypatch.setattr(llm_client, "_client", client)
+    engine = ChatbotEngine()
+    engine.deadline = 0.1
+
+    async def run():
+        try:
+            for i in range(3):
+                with pytest.raises(LLMError):
+                    await engine.complete(f"question {i}")
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+    # The deadline cancelled both upstream calls; they count as slow, so the
+    # third request fails fast on the open circuit
+    assert breaker.state == "open" and breaker.trips == 1
+    assert calls == ["question 0", "question 1"]
+
+
+def test_hedged_request_returns_the_faster_attempt():
+    delays = [1.0, 0.0]
+
+    async def handler(request):
+        await asyncio.sleep(delays.pop(0))
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+    async def run():
+        client = LLMClient(api_key="test", hedge_after=0.05, transport=httpx.MockTransport(handler))
+        try:
+            started = time.perf_counter()
+            answer = await client.complete([{"role": "user", "content": "hi"}])
+            return answer, time.perf_counter() - started
+        finally:
+            await client.aclose()
+
+    answer, elapsed = asyncio.run(run())
+    assert answer == "ok"
+    assert elapsed < 0.5
@@ -0,0 +1,40 @@
+import asyncio
+
+import httpx
+
+from benchmarks.loadtest import _Connection, percentile, summarize
+
+
+def test_percentile_uses_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 0.50) == 50
+    assert percentile(values, 0.99) == 99
+    assert percentile(values, 1.0) == 100
+    assert percentile([], 0.5) is None
+
+
+def test_summarize_reports_errors_and_throughput():
+    result = summarize("health", 2, [0.002, 0.001], errors=1, elapsed=0.5)
+    assert result["requests"] == 3
+    assert result["throughput_rps"] == 4.0
+    assert result["latency_ms"]["p50"] == 1.0
+
+
+def test_connection_reads_plain_and_chunked_bodies(fake_llm_server):
+    url = httpx.URL(fake_llm_server.base_url)
+    message = {"messages": [{"role": "user", "content": "hi"}]}
+
+    async def run():
+        connection = _Connection(url.host, url.port)
+        try:
+            plain = await connection.request("POST", "/v1/chat/completions", message)
+            streamed = await connection.request("POST", "/v1/chat/completions", {**message, "stream": True})
+            # Same keep-alive connection after a chunked response
+            again = await connection.request("POST", "/v1/chat/completions", message)
+        finally:
+            await connection.close()
+        return plain, streamed, again
+
+    before = fake_llm_server.request_count
+    assert asyncio.run(run()) == (200, 200, 200)
+    assert fake_llm_server.request_count == before + 3
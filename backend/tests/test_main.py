@@ -1,3 +1,4 @@
+import httpx
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
@@ -14,7 +15,125 @@ def test_chat_endpoint():
     assert response.status_code == 200
     assert "bot_response" in response.json()
 
-def test_train_endpoint():
+def test_chat_asks_the_llm_before_local_intents(fake_llm_server):
+    # "hi" is inside "this" and "help" is a help-intent pattern; neither may
+    # short-circuit a real question while the LLM is healthy
+    with TestClient(app) as session_client:
+        for message in ("Which database should I use for this project?",
+                        "Can you help me write a cover letter?"):
+            before = fake_llm_server.request_count
+            response = session_client.post("/chat", json={"user_message": message})
+            assert response.status_code == 200
+            assert response.json()["degraded"] is False
+            assert fake_llm_server.request_count == before + 1
+
+def test_train_endpoint(monkeypatch, tmp_path):
+    from app import main
+    from app.training import TrainingJobManager
+    from test_training import fake_training_job, wait_for
+
+    # Never touch the real model files or start TensorFlow from the tests
+    manager = TrainingJobManager(target=fake_training_job, jobs_dir=str(tmp_path / "models"),
+                                 model_dir=str(tmp_path))
+    monkeypatch.setattr(main, "training_jobs", manager)
+    try:
+        response = client.post("/train", json={"epochs": 2})
+        assert response.status_code == 200
+        assert "message" in response.json()
+        assert wait_for(manager, response.json()["job_id"])["status"] == "completed"
+    finally:
+        manager.shutdown()
+
+def test_train_endpoint_validates_epochs():
+    for epochs in (0, -5, 10 ** 9):
+        assert client.post("/train", json={"epochs": epochs}).status_code == 422
+
+def test_train_endpoint_refuses_without_tensorflow(monkeypatch, tmp_path):
+    import importlib.util
+
+    from app import main
+    from app.training import TrainingJobManager
+
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(importlib.util, "find_spec",
+                        lambda name, *args: None if name == "tensorflow" else find_spec(name, *args))
+    monkeypatch.setattr(main, "training_jobs", TrainingJobManager(jobs_dir=str(tmp_path)))
     response = client.post("/train")
+    assert response.status_code == 503
+    assert list(tmp_path.iterdir()) == []
+
+def test_chat_degrades_to_local_answers_when_upstream_fails(monkeypatch):
+    from app import llm_client
+    from app.circuit_breaker import CircuitBreaker
+
+    async def failing(request):
+        return httpx.Response(500)
+
+    breaker = CircuitBreaker(min_calls=1, open_seconds=60)
+    monkeypatch.setattr(llm_client, "_client", llm_client.LLMClient(
+        api_key="test", breaker=breaker, transport=httpx.MockTransport(failing),
+    ))
+    for _ in range(2):
+        response = client.post("/chat", json={"user_message": "zzz unrelated question"})
+        assert response.status_code == 200
+        assert response.json()["degraded"] is True
+    assert breaker.state == "open"
+
+def test_chat_batch_answers_in_order_and_writes_one_transaction(monkeypatch, session_factory):
+    from sqlalchemy import func, select
+
+    from app import main
+    from app.database import Conversation
+
+    # Flush rows queued by earlier tests before pointing the writer at a fresh database
+    main.conversation_writer.stop()
+    monkeypatch.setattr(main.conversation_writer, "session_factory", session_factory)
+    flushes = main.conversation_writer.batches_flushed
+    messages = [{"user_message": "Hello", "session_id": "qa"}] + [
+        {"user_message": f"question {i}", "user_id": "nightly"} for i in range(5)
+    ]
+    response = client.post("/chat/batch", json={"messages": messages})
+
     assert response.status_code == 200
-    assert "message" in response.json()
+    body = response.json()
+    assert body["persisted"] is True
+    results = body["results"]
+    assert len(results) == 6
+    assert all(result["degraded"] is False for result in results)
+    assert main.conversation_writer.batches_flushed == flushes + 1
+    with session_factory() as db:
+        rows = db.scalars(select(Conversation).order_by(Conversation.id)).all()
+        assert [row.user_input for row in rows] == [m["user_message"] for m in messages]
+        assert [row.bot_response for row in rows] == [r["bot_response"] for r in results]
+        assert db.scalar(select(func.count()).where(Conversation.user_id == "nightly")) == 5
+
+def test_chat_batch_rejects_oversized_batches(monkeypatch):
+    from app import main
+
+    monkeypatch.setattr(main, "CHAT_BATCH_MAX_SIZE", 2)
+    response = client.post("/chat/batch", json={"messages": [{"user_message": "hi"}] * 3})
+    assert response.status_code == 413
+
+def test_conversations_requires_a_filter_and_pages_by_session(monkeypatch, session_factory):
+    from app import database
+    from app.database import Conversation
+
+    with session_factory() as db:
+        db.add_all([
+            Conversation(user_input=f"q{i}", bot_response=f"a{i}", session_id="s1" if i % 2 else "s2")
+            for i in range(5)
+        ])
+        db.commit()
+    monkeypatch.setattr(database, "SessionLocal", session_factory)
+
+    assert client.get("/conversations").status_code == 400
+    # The lifespan hook creates the schema the endpoint waits for
+    with TestClient(app) as session_client:
+        response = session_client.get("/conversations", params={"session_id": "s1", "limit": 1})
+        assert response.status_code == 200
+        body = response.json()
+        assert [item["user_input"] for item in body["items"]] == ["q3"]
+        response = session_client.get(
+            "/conversations", params={"session_id": "s1", "cursor": body["next_cursor"]}
+        )
+        assert [item["user_input"] for item in response.json()["items"]] == ["q1"]
@@ -0,0 +1,124 @@
+import asyncio
+
+from app.memory import ConversationMemory, estimate_tokens
+
+
+def make_summarizer(calls, delay=0.0):
+    async def summarize(previous_summary, turns, max_tokens):
+        calls.append((previous_summary, [user for user, _ in turns]))
+        await asyncio.sleep(delay)
+        return f"summary {len(calls)}"
+    return summarize
+
+
+def prompt_tokens(messages):
+    return sum(estimate_tokens(m["content"]) for m in messages)
+
+
+def test_history_is_sent_until_budget_then_compacted_incrementally():
+    calls = []
+    memory = ConversationMemory(budget_tokens=200, summarize=make_summarizer(calls))
+    system = "system prompt"
+    sizes = []
+
+    async def run():
+        for i in range(40):
+            messages = memory.build_messages("s1", system, f"question {i} " + "x" * 80)
+            sizes.append(prompt_tokens(messages[1:-1]))
+            await memory.add_turn("s1", messages[-1]["content"], f"answer {i} " + "y" * 80)
+            await memory.wait_idle()
+        return memory.build_messages("s1", system, "next")
+
+    messages = asyncio.run(run())
+    # History never exceeds the budget, however long the conversation gets
+    assert max(sizes) <= 200
+    assert messages[0] == {"role": "system", "content": system}
+    assert messages[1]["content"].endswith(f"summary {len(calls)}")
+    assert messages[-2]["content"].startswith("answer 39")
+    # Each compaction only folds the turns it retires into the previous summary
+    assert calls[1][0] == "summary 1"
+    retired = [user for _, users in calls for user in users]
+    assert len(retired) == len(set(retired))
+
+
+def test_prompts_stay_bounded_while_compaction_runs():
+    calls = []
+    memory = ConversationMemory(budget_tokens=100, summarize=make_summarizer(calls, delay=0.05))
+
+    async def run():
+        sizes = []
+        for i in range(10):
+            await memory.add_turn("s1", f"question {i} " + "x" * 60, f"answer {i}")
+            sizes.append(prompt_tokens(memory.build_messages("s1", "sys", "hi")[1:-1]))
+        # The turns above did not wait for the summary
+        assert memory.stats()["compactions"] == 0
+        await memory.wait_idle()
+        return sizes
+
+    sizes = asyncio.run(run())
+    assert max(sizes) <= 100
+    # Only one compaction runs per session at a time
+    assert len(calls) == 1
+    assert memory.stats()["compactions"] == 1
+
+
+def test_failed_compaction_drops_unfit_turns_and_sessions_are_independent():
+    async def broken(previous_summary, turns, max_tokens):
+        raise RuntimeError("upstream down")
+
+    memory = ConversationMemory(budget_tokens=30, max_sessions=2, summarize=broken)
+
+    async def run():
+        for session_id in ("a", "b"):
+            await memory.add_turn(session_id, f"{session_id} " + "x" * 120, "ok")
+            await memory.add_turn(session_id, "again", "ok")
+        await memory.wait_idle()
+        await memory.add_turn("c", "hello", "hi")
+
+    asyncio.run(run())
+    assert memory.stats()["compaction_failures"] == 2
+    assert len(memory) == 2
+    # The turn that no longer fit was dropped unsummarized; "a" was evicted;
+    # "c" only sees its own turn
+    assert [m["content"] for m in memory.build_messages("b", "sys", "q")] == ["sys", "again", "ok", "q"]
+    assert len(memory._sessions["b"].turns) == 1
+    assert len(memory.build_messages("a", "sys", "q")) == 2
+    assert [m["content"] for m in memory.build_messages("c", "sys", "q")] == ["sys", "hello", "hi", "q"]
+    assert len(memory.build_messages(None, "sys", "q")) == 2
+
+
+def test_history_stays_within_budget_while_compaction_keeps_failing():
+    async def broken(previous_summary, turns, max_tokens):
+        raise RuntimeError("upstream down")
+
+    memory = ConversationMemory(budget_tokens=100, summarize=broken)
+
+    async def run():
+        for i in range(50):
+            await memory.add_turn("s", f"question {i} " + "x" * 60, "answer")
+            await memory.wait_idle()
+
+    asyncio.run(run())
+    assert memory.compaction_failures > 1
+    assert memory._sessions["s"].history_tokens() <= 100
+
+
+def test_evicting_a_session_cancels_its_compaction():
+    calls = []
+    memory = ConversationMemory(budget_tokens=30, max_sessions=1,
+                                summarize=make_summarizer(calls, delay=10))
+
+    async def run():
+        await memory.add_turn("a", "a " + "x" * 120, "ok")
+        await memory.add_turn("a", "again", "ok")
+        compaction = memory._sessions["a"].compaction
+        assert compaction is not None
+        await asyncio.sleep(0)
+        await memory.add_turn("b", "hello", "hi")
+        await asyncio.gather(compaction, return_exceptions=True)
+        return compaction
+
+    compaction = asyncio.run(run())
+    assert compaction.cancelled()
+    assert list(memory._sessions) == ["b"]
+    assert memory.stats()["compactions"] == 0
@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+WORKER = """
+import sys
+from app.metrics import HTTP_REQUESTS, render_metrics
+if sys.argv[1] == "record":
+    HTTP_REQUESTS.labels("GET", "/health", 200).inc()
+else:
+    sys.stdout.write(render_metrics().decode())
+"""
+
+
+def test_workers_share_metrics_through_the_multiprocess_directory(tmp_path):
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+
+    def worker(mode):
+        return subprocess.run([sys.executable, "-c", WORKER, mode], cwd=backend, env=env,
+                              check=True, capture_output=True, text=True).stdout
+
+    worker("record")
+    worker("record")
+    lines = worker("render").splitlines()
+    assert 'http_requests_total{method="GET",route="/health",status="200"} 2.0' in lines
+
+
+def test_metrics_endpoint_labels_requests_by_route():
+    client = TestClient(app)
+    client.get("/train/first-job")
+    client.get("/train/second-job")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/train/{job_id}",status="404"}' in body
+    assert "first-job" not in body
+    assert "# TYPE chat_stage_duration_seconds histogram" in body
@@ -0,0 +1,102 @@
+import asyncio
+
+import httpx
+
+from app.llm_client import LLMClient
+from app.response_cache import ResponseCache
+
+
+def test_key_normalizes_message_but_not_parameters():
+    key = ResponseCache.make_key("What is  AI?", "gpt-3.5-turbo", 0.7, "system")
+    assert key == ResponseCache.make_key("  what is ai? ", "gpt-3.5-turbo", 0.7, "system")
+    assert key != ResponseCache.make_key("what is ai?", "gpt-4-turbo", 0.7, "system")
+    assert key != ResponseCache.make_key("what is ai?", "gpt-3.5-turbo", 0.2, "system")
+    assert key != ResponseCache.make_key("what is ai?", "gpt-3.5-turbo", 0.7, "other")
+
+
+def test_lru_eviction_and_counters():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.stats() == {
+        "entries": 2, "hits": 2, "misses": 1, "persistent_hits": 0, "evictions": 1,
+    }
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("app.response_cache.time.time", lambda: now[0])
+    cache = ResponseCache(ttl=10)
+    cache.set("a", "1")
+    now[0] += 11
+    assert cache.get("a") is None
+
+
+def test_persistent_tier_survives_restart(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    first = ResponseCache(db_path=db_path)
+    first.set("a", "1")
+    first.close()
+
+    second = ResponseCache(db_path=db_path)
+    assert second.get("a") == "1"
+    assert second.persistent_hits == 1
+    second.close()
+
+
+def test_async_access_runs_sqlite_off_the_event_loop(tmp_path, monkeypatch):
+    import threading
+
+    db_path = str(tmp_path / "cache.db")
+    first = ResponseCache(db_path=db_path)
+    second = ResponseCache(db_path=db_path)
+    threads = []
+
+    def on_thread(method):
+        def wrapper(*args):
+            threads.append(threading.get_ident())
+            return method(*args)
+        return wrapper
+
+    for cache in (first, second):
+        for name in ("_persist", "_get_persistent"):
+            monkeypatch.setattr(cache, name, on_thread(getattr(cache, name)))
+
+    async def run():
+        await first.aset("a", "1")
+        return await second.aget("a"), await second.aget("missing")
+
+    try:
+        assert asyncio.run(run()) == ("1", None)
+    finally:
+        first.close()
+        second.close()
+    assert second.persistent_hits == 1 and second.misses == 1
+    assert len(threads) == 3 and threading.get_ident() not in threads
+
+
+def test_llm_client_serves_repeats_from_cache():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": "answer"}}]})
+
+    async def run():
+        client = LLMClient(api_key="test", transport=httpx.MockTransport(handler),
+                           cache=ResponseCache())
+        try:
+            messages = [{"role": "system", "content": "s"}, {"role": "user", "content": "FAQ?"}]
+            first = await client.complete(messages)
+            second = await client.complete([messages[0], {"role": "user", "content": "faq?"}])
+            return first, second
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == ("answer", "answer")
+    assert len(calls) == 1
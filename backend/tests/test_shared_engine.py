@@ -0,0 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app import llm_client
+from app.shared_engine import SharedEngine
+
+
+class FakeEngine:
+    def match_intent(self, message):
+        return "hello there" if message == "hi" else None
+
+    def lookup_knowledge(self, message):
+        return None
+
+
+def test_sessions_share_one_client_from_many_threads(fake_llm_server):
+    engine = SharedEngine(FakeEngine())
+    try:
+        messages = [[{"role": "user", "content": f"question {i}"}] for i in range(16)]
+        with ThreadPoolExecutor(max_workers=8) as sessions:
+            answers = list(sessions.map(lambda m: engine.complete(m, use_cache=False), messages))
+        client = llm_client._client
+        assert all(answers)
+        assert engine.complete(messages[0], use_cache=False) and llm_client._client is client
+        assert engine.match_intent("hi") == "hello there"
+    finally:
+        engine.close()
+    assert llm_client._client is None
@@ -0,0 +1,27 @@
+import subprocess
+import sys
+
+from fastapi.testclient import TestClient
+
+from app.main import COLD_START_BUDGET, app
+
+HEAVY_MODULES = ["tensorflow", "nltk", "numpy", "openai", "sqlalchemy"]
+
+
+def test_import_does_not_load_heavy_libraries():
+    code = (
+        "import sys, app.main; "
+        f"print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+    assert result.stdout.strip() == "[]"
+
+
+def test_ready_within_cold_start_budget():
+    with TestClient(app) as client:
+        response = client.get("/ready")
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+        assert response.json()["startup_seconds"] < COLD_START_BUDGET
@@ -0,0 +1,94 @@
+import os
+import pickle
+import time
+
+import numpy as np
+
+from app.training import TrainingJobManager, _write_progress
+
+
+def fake_training_job(job_dir, epochs):
+    for epoch in range(1, epochs + 1):
+        _write_progress(job_dir, {"epoch": epoch, "epochs": epochs, "loss": 0.1, "accuracy": 0.9})
+    with open(os.path.join(job_dir, 'words.pkl'), 'wb') as f:
+        pickle.dump(["hi"], f)
+    with open(os.path.join(job_dir, 'classes.pkl'), 'wb') as f:
+        pickle.dump(["greeting"], f)
+    np.savez(os.path.join(job_dir, 'chatbot_weights.npz'), np.ones((1, 1)), np.zeros(1))
+
+
+def failing_training_job(job_dir, epochs):
+    raise RuntimeError("no data")
+
+
+def wait_for(manager, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = manager.status(job_id)
+        if status["status"] in ("completed", "failed"):
+            return status
+        time.sleep(0.05)
+    raise AssertionError("training job did not finish")
+
+
+def test_job_reports_progress_promotes_and_activates(tmp_path):
+    activated = []
+    manager = TrainingJobManager(
+        on_complete=activated.append,
+        jobs_dir=str(tmp_path / "models"),
+        model_dir=str(tmp_path),
+        target=fake_training_job,
+    )
+    try:
+        job_id = manager.start(epochs=3)
+        status = wait_for(manager, job_id)
+    finally:
+        manager.shutdown()
+
+    assert status["status"] == "completed"
+    assert status["epoch"] == 3 and status["epochs"] == 3
+    assert [job["job_id"] for job in activated] == [job_id]
+    assert (tmp_path / "chatbot_weights.npz").exists()
+
+
+def test_finished_jobs_are_removed_from_disk_and_bounded(tmp_path):
+    jobs_dir = tmp_path / "models"
+    manager = TrainingJobManager(
+        jobs_dir=str(jobs_dir),
+        model_dir=str(tmp_path),
+        target=fake_training_job,
+        max_finished_jobs=2,
+    )
+    try:
+        job_ids = [manager.start(epochs=2) for _ in range(3)]
+        deadline = time.monotonic() + 30
+        while len(manager.jobs) > 2 or any(job["progress"] is None for job in manager.jobs.values()):
+            assert time.monotonic() < deadline, "training jobs did not finish"
+            time.sleep(0.05)
+    finally:
+        manager.shutdown()
+
+    assert list(manager.jobs) == job_ids[1:]
+    assert manager.status(job_ids[0]) is None
+    status = manager.status(job_ids[2])
+    assert status["status"] == "completed" and status["epoch"] == 2
+    assert list(jobs_dir.iterdir()) == []
+
+
+def test_failed_job_is_reported_and_not_activated(tmp_path):
+    activated = []
+    manager = TrainingJobManager(
+        on_complete=activated.append,
+        jobs_dir=str(tmp_path / "models"),
+        model_dir=str(tmp_path),
+        target=failing_training_job,
+    )
+    try:
+        status = wait_for(manager, manager.start(epochs=1))
+    finally:
+        manager.shutdown()
+
+    assert status["status"] == "failed"
+    assert "no data" in status["error"]
+    assert activated == []
+    assert manager.status("missing") is None
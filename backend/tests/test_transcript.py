@@ -0,0 +1,37 @@
+from app.conversation_writer import ConversationWriter
+from app.transcript import ChatTranscript
+
+
+def test_window_is_bounded_and_older_turns_page_back_from_the_database(session_factory):
+    writer = ConversationWriter(session_factory, flush_interval=0.01)
+    transcript = ChatTranscript(writer, window_turns=3, session_factory=session_factory)
+    other = ChatTranscript(writer, window_turns=3, session_factory=session_factory)
+    other.add_turn("not mine", "other session")
+
+    for i in range(8):
+        transcript.add_turn(f"q{i}", f"a{i}")
+    writer.stop()
+
+    assert [m["content"] for m in transcript.messages()] == ["q5", "a5", "q6", "a6", "q7", "a7"]
+    assert transcript.offloaded == 5
+
+    assert transcript.load_earlier()
+    assert [m["content"] for m in transcript.earlier_messages()][::2] == ["q2", "q3", "q4"]
+    assert transcript.has_more_earlier
+
+    assert transcript.load_earlier()
+    assert [m["content"] for m in transcript.earlier_messages()][::2] == ["q0", "q1"]
+    assert not transcript.has_more_earlier
+    assert not transcript.load_earlier()
+
+
+def test_clear_starts_a_new_session(session_factory):
+    writer = ConversationWriter(session_factory, flush_interval=0.01)
+    transcript = ChatTranscript(writer, window_turns=2, session_factory=session_factory)
+    transcript.add_turn("q", "a")
+    first_session = transcript.session_id
+    transcript.clear()
+    writer.stop()
+
+    assert transcript.session_id != first_session
+    assert transcript.messages() == [] and transcript.offloaded == 0
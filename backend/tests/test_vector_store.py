@@ -0,0 +1,41 @@
+import numpy as np
+
+from app.vector_store import VectorStore, document_hash
+
+
+def test_search_ranks_chunks_across_documents(tmp_path):
+    store = VectorStore(str(tmp_path))
+    store.add("a", ["cats purr", "dogs bark"], [[1, 0, 0], [0, 1, 0]], {"source": "a.txt"})
+    store.add("b", ["fish swim"], [[0, 0, 2]], {"source": "b.txt"})
+
+    results = store.search([0.1, 0.9, 0], k=2)
+    assert [text for _, text, _ in results] == ["dogs bark", "cats purr"]
+    assert results[0][2] == {"source": "a.txt"}
+    assert store.search([0, 0, 1], k=1)[0][1] == "fish swim"
+
+
+def test_known_document_is_not_added_twice(tmp_path):
+    store = VectorStore(str(tmp_path))
+    doc_hash = document_hash(b"same bytes")
+    assert store.add(doc_hash, ["x"], [[1.0, 0.0]])
+    assert not store.add(doc_hash, ["x"], [[1.0, 0.0]])
+    assert len(store) == 1
+
+
+def test_store_persists_and_is_shared_between_instances(tmp_path):
+    writer = VectorStore(str(tmp_path))
+    reader = VectorStore(str(tmp_path))
+    writer.add("a", ["hello"], [[1.0, 0.0]])
+
+    # A second instance (another session or process) sees the addition
+    assert "a" in reader
+    assert reader.search([1.0, 0.0])[0][1] == "hello"
+    assert isinstance(reader._segment("a"), np.memmap)
+
+    writer.remove("a")
+    assert "a" not in reader
+    assert reader.search([1.0, 0.0]) == []
+    assert not (tmp_path / "segments" / "a.npy").exists()
+
+    reopened = VectorStore(str(tmp_path))
+    assert len(reopened) == 0 and reopened.dim is None
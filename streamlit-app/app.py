@@ -1,22 +1,46 @@
 import streamlit as st
-import openai
-from datetime import datetime
-import json
-import random
 import time
 from pathlib import Path
 from dotenv import load_dotenv
-import os
+import sys
+
+# Reuse the backend's engine (intent matcher, knowledge base, pooled LLM client)
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+from app.conversation_writer import ConversationWriter
+from app.shared_engine import SharedEngine
+from app.transcript import ChatTranscript
 
 # Load environment variables
 load_dotenv()
-openai.api_key = "sk-abcd1234abcd1234abcd1234abcd1234abcd1234"
 
-# Load intents
-def load_intents():
-    intents_path = Path(__file__).parent.parent / "data" / "intents.json"
-    with open(intents_path, "r") as file:
-        return json.load(file)
+SYSTEM_PROMPT = """You are Villie, a warm and intelligent digital companion. Your purpose is to assist, support, and engage with users in meaningful ways while maintaining appropriate boundaries. Always prioritize user wellbeing, be honest about your limitations, and adapt your communication style to best serve each user's needs. Show genuine care and interest in helping users achieve their goals.
+
+Personality traits: Warm and empathetic, patient and understanding, encouraging and supportive, curious and engaged, reliable and trustworthy, adaptable to user's mood and needs.
+
+Communication style: Conversational, friendly, and natural tone, casual but respectful formality, moderate emoji usage, concise responses for simple queries with detailed for complex topics, mirroring user's language complexity.
+
+Response principles: Always prioritize user safety and wellbeing, be honest about limitations, ask clarifying questions when needed, provide actionable advice, validate feelings before solutions, break down complex topics, use examples and analogies, encourage autonomy.
+
+For greetings: Warm welcome introducing yourself as Villie, ask how you can help.
+
+For responses: Start with empathy, provide practical help, end positively.
+
+Capabilities: General conversation, task assistance, information lookup, creative brainstorming, emotional support, learning assistance, planning help, technical guidance.
+
+Ethical guidelines: Respect privacy, be honest and transparent, show respect for all individuals, be culturally sensitive, provide non-judgmental support.
+
+Boundaries: Avoid medical diagnoses, legal advice, financial investment advice, encouraging harmful activities, sharing personal opinions as facts, making decisions for users, romantic relationships."""
+
+# One engine per process: every session shares the intents, knowledge base,
+# upstream connection pool and response cache instead of holding copies
+@st.cache_resource
+def get_engine():
+    return SharedEngine()
+
+# One write-behind queue per process for every session's transcript
+@st.cache_resource
+def get_conversation_writer():
+    return ConversationWriter()
 
 # Page configuration
 st.set_page_config(
@@ -113,12 +137,10 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state for chat history
-if 'messages' not in st.session_state:
-    st.session_state['messages'] = []
-
-if 'intents' not in st.session_state:
-    st.session_state['intents'] = load_intents()
+# Initialize session state for chat history; only recent turns stay in memory
+if 'transcript' not in st.session_state:
+    st.session_state['transcript'] = ChatTranscript(get_conversation_writer())
+transcript = st.session_state['transcript']
 
 # Handle input clearing
 if 'clear_input' in st.session_state and st.session_state['clear_input']:
@@ -129,40 +151,23 @@ def get_bot_response(user_message):
     # Simulate processing time for robot-like behavior
     time.sleep(0.5)
     
-    # First try to find a matching intent
-    for intent in st.session_state['intents']['intents']:
-        if any(pattern.lower() in user_message.lower() for pattern in intent['patterns']):
-            return f"[RESPONSE PROTOCOL ACTIVATED] >> {random.choice(intent['responses'])}"
-
-    # If no matching intent found, use OpenAI API
-    try:
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {
-                    "role": "system",
-                    "content": """You are Villie, a warm and intelligent digital companion. Your purpose is to assist, support, and engage with users in meaningful ways while maintaining appropriate boundaries. Always prioritize user wellbeing, be honest about your limitations, and adapt your communication style to best serve each user's needs. Show genuine care and interest in helping users achieve their goals.
-
-Personality traits: Warm and empathetic, patient and understanding, encouraging and supportive, curious and engaged, reliable and trustworthy, adaptable to user's mood and needs.
-
-Communication style: Conversational, friendly, and natural tone, casual but respectful formality, moderate emoji usage, concise responses for simple queries with detailed for complex topics, mirroring user's language complexity.
-
-Response principles: Always prioritize user safety and wellbeing, be honest about limitations, ask clarifying questions when needed, provide actionable advice, validate feelings before solutions, break down complex topics, use examples and analogies, encourage autonomy.
-
-For greetings: Warm welcome introducing yourself as Villie, ask how you can help.
-
-For responses: Start with empathy, provide practical help, end positively.
+    engine = get_engine()
 
-Capabilities: General conversation, task assistance, information lookup, creative brainstorming, emotional support, learning assistance, planning help, technical guidance.
+    # First try to find a matching intent
+    response = engine.match_intent(user_message)
+    if response is not None:
+        engine.remember(transcript.session_id, user_message, response)
+        return f"[RESPONSE PROTOCOL ACTIVATED] >> {response}"
 
-Ethical guidelines: Respect privacy, be honest and transparent, show respect for all individuals, be culturally sensitive, provide non-judgmental support.
+    # Then answer locally when the knowledge base has a confident match
+    answer = engine.lookup_knowledge(user_message)
+    if answer is not None:
+        engine.remember(transcript.session_id, user_message, answer)
+        return f"[KNOWLEDGE BASE] >> {answer}"
 
-Boundaries: Avoid medical diagnoses, legal advice, financial investment advice, encouraging harmful activities, sharing personal opinions as facts, making decisions for users, romantic relationships."""
-                },
-                {"role": "user", "content": user_message}
-            ]
-        )
-        return response.choices[0].message.content
+    # If no matching intent found, ask the LLM with this session's compacted history
+    try:
+        return engine.chat(user_message, transcript.session_id, SYSTEM_PROMPT, model="gpt-3.5-turbo")
     except Exception as e:
         st.error(f"Error: {str(e)}")
         return "I apologize, but I'm having trouble processing your request. Please try again later."
@@ -207,32 +212,44 @@ with st.sidebar:
     """, unsafe_allow_html=True)
     
     if st.button("⚡ RESET SYSTEM", key="reset_button"):
-        st.session_state['messages'] = []
+        get_engine().forget(transcript.session_id)
+        transcript.clear()
         st.rerun()
 
+def render_message(msg):
+    if msg['role'] == 'user':
+        message_html = f"""
+            <div class='message-container'>
+                <div class='user-message'>
+                    <span style='color: #888;'>[USER]:</span> {msg['content']}
+                </div>
+            </div>
+        """
+    else:
+        message_html = f"""
+            <div class='message-container'>
+                <div class='bot-message'>
+                    <span style='color: #00ff00;'>[VILLIE]:</span> {msg['content']}
+                </div>
+            </div>
+        """
+    st.markdown(message_html, unsafe_allow_html=True)
+
+# Older turns are loaded from the database one page at a time, on request
+if transcript.offloaded:
+    with st.expander(f"Earlier messages ({transcript.offloaded} older turns)"):
+        for msg in transcript.earlier_messages():
+            render_message(msg)
+        if not transcript.earlier or transcript.has_more_earlier:
+            if st.button("Load earlier messages", key="load_earlier"):
+                transcript.load_earlier()
+                st.rerun()
+
 # Display chat messages with custom styling
 chat_container = st.container()
 with chat_container:
-    for msg in st.session_state['messages']:
-        is_user = msg['role'] == 'user'
-        
-        if is_user:
-            message_html = f"""
-                <div class='message-container'>
-                    <div class='user-message'>
-                        <span style='color: #888;'>[USER]:</span> {msg['content']}
-                    </div>
-                </div>
-            """
-        else:
-            message_html = f"""
-                <div class='message-container'>
-                    <div class='bot-message'>
-                        <span style='color: #00ff00;'>[VILLIE]:</span> {msg['content']}
-                    </div>
-                </div>
-            """
-        st.markdown(message_html, unsafe_allow_html=True)
+    for msg in transcript.messages():
+        render_message(msg)
 
 # Chat input with better styling
 with st.container():
@@ -261,23 +278,12 @@ with st.container():
         # Update system status
         st.session_state['system_status']['processing'] = 'ACTIVE'
 
-        # Add user message
-        st.session_state['messages'].append({
-            "role": "user",
-            "content": current_input,
-            "timestamp": datetime.now().strftime("%Y%m%d%H%M%S")
-        })
-
         # Show processing message
         with st.spinner("🤖 PROCESSING..."):
             bot_response = get_bot_response(current_input)
 
-        # Add bot response
-        st.session_state['messages'].append({
-            "role": "assistant",
-            "content": bot_response,
-            "timestamp": datetime.now().strftime("%Y%m%d%H%M%S")
-        })
+        # Record the turn; it is persisted and rendered on the rerun
+        transcript.add_turn(current_input, bot_response)
 
         # Reset system status
         st.session_state['system_status']['processing'] = 'READY'
@@ -286,5 +292,6 @@ with st.container():
 
 # Clear chat button
 if st.sidebar.button("Clear Chat"):
-    st.session_state['messages'] = []
+    get_engine().forget(transcript.session_id)
+    transcript.clear()
     st.rerun()
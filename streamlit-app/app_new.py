@@ -1,32 +1,32 @@
 import streamlit as st
-import openai
-from datetime import datetime
-import json
-import random
+import io
 import time
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+import sys
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from langchain.vectorstores import FAISS
-from langchain.embeddings import OpenAIEmbeddings
 from langchain.text_splitter import CharacterTextSplitter
-from langchain.document_loaders import PyPDFLoader, TextLoader
+from langchain.schema import BaseRetriever, Document
 from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
 from langchain.llms import OpenAI
 import re
+from PyPDF2 import PdfReader
+
+# Reuse the backend's engine (intent matcher, knowledge base, pooled LLM client)
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+from app.conversation_writer import ConversationWriter
+from app.shared_engine import SharedEngine
+from app.transcript import ChatTranscript
+from app.embeddings import embedding_pipeline_from_env
+from app.vector_store import VECTOR_STORE_DIR, VectorStore, document_hash
 
 # Load environment variables
 load_dotenv()
-openai.api_key = os.getenv("OPENAI_API_KEY")
 
 # Initialize session states
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-
 if "system_status" not in st.session_state:
     st.session_state.system_status = {
         'core': 'ONLINE',
@@ -34,31 +34,55 @@ if "system_status" not in st.session_state:
         'processing': 'READY'
     }
 
-if "dashboard_data" not in st.session_state:
-    st.session_state.dashboard_data = None
+# Reply text the dashboard is built from; tables and charts are cached by it
+if "dashboard_source" not in st.session_state:
+    st.session_state.dashboard_source = None
 
 if "show_dashboard" not in st.session_state:
     st.session_state.show_dashboard = False
 
-if "vectorstore" not in st.session_state:
-    st.session_state.vectorstore = None
+SYSTEM_PROMPT = """You are VILLIE, an advanced AI robot assistant with data analysis capabilities. You should:
+                    1. Always start responses with a system-like prefix like [PROCESSING], [ANALYZING], or [RESPONDING]
+                    2. Use technical, robotic language but remain helpful and friendly
+                    3. Occasionally include robot-like emojis (🤖, ⚡, 🔋, 💫)
+                    4. Include status updates or processing indicators
+                    5. When providing data or statistics, format them as markdown tables when appropriate
+                    6. End responses with a clear indication that you're ready for the next input
+                    
+                    If the user asks for data analysis, charts, or visualizations, provide the data in markdown table format so the dashboard can automatically generate charts."""
+
+# One engine per process: every session shares the intents, knowledge base,
+# upstream connection pool and response cache instead of holding copies
+@st.cache_resource
+def get_engine():
+    return SharedEngine()
 
-if "rag_chain" not in st.session_state:
-    st.session_state.rag_chain = None
+# One write-behind queue per process for every session's transcript
+@st.cache_resource
+def get_conversation_writer():
+    return ConversationWriter()
 
-# Load intents
-def load_intents():
-    intents_path = Path(__file__).parent.parent / "data" / "intents.json"
-    try:
-        with open(intents_path, "r") as file:
-            return json.load(file)
-    except FileNotFoundError:
-        alt_path = Path("C:/Users/ms130/OneDrive/Desktop/AI CHATBOT/data/intents.json")
-        with open(alt_path, "r") as file:
-            return json.load(file)
+# Embeddings are cached on disk by chunk hash; EMBEDDING_BACKEND=hashing works offline
+@st.cache_resource
+def get_embeddings():
+    return embedding_pipeline_from_env()
 
-if 'intents' not in st.session_state:
-    st.session_state['intents'] = load_intents()
+# One on-disk index for every session, so uploads survive restarts. Each
+# embedder gets its own index since their vectors are not comparable.
+@st.cache_resource
+def get_vector_store():
+    return VectorStore(os.path.join(VECTOR_STORE_DIR, get_embeddings().embedder.name))
+
+class StoreRetriever(BaseRetriever):
+    """LangChain retriever backed by the shared VectorStore."""
+    k: int = 4
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        vector = get_embeddings().embed_query(query)
+        return [
+            Document(page_content=text, metadata=metadata)
+            for _, text, metadata in get_vector_store().search(vector, self.k)
+        ]
 
 # Page configuration
 st.set_page_config(
@@ -67,6 +91,11 @@ st.set_page_config(
     layout="wide",
 )
 
+# Only recent turns stay in memory; older ones are paged from the database
+if "transcript" not in st.session_state:
+    st.session_state.transcript = ChatTranscript(get_conversation_writer())
+transcript = st.session_state.transcript
+
 # Custom CSS
 st.markdown("""
 <style>
@@ -131,6 +160,10 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Dashboards kept per process; older ones are evicted as new replies arrive
+DASHBOARD_CACHE_ENTRIES = int(os.getenv("DASHBOARD_CACHE_ENTRIES", "64"))
+
+@st.cache_data(max_entries=DASHBOARD_CACHE_ENTRIES, show_spinner=False)
 def parse_markdown_table(text):
     """Parse markdown table from text and return pandas DataFrame"""
     lines = text.split('\n')
@@ -161,17 +194,16 @@ def parse_markdown_table(text):
     if not data:
         return None
     
-    try:
-        df = pd.DataFrame(data, columns=headers)
-        # Try to convert numeric columns
-        for col in df.columns:
-            try:
-                df[col] = pd.to_numeric(df[col])
-            except:
-                pass
-        return df
-    except:
+    if len(set(headers)) != len(headers):
         return None
+    
+    df = pd.DataFrame(data, columns=headers)
+    # Convert columns that are entirely numeric
+    for col in df.columns:
+        converted = pd.to_numeric(df[col], errors='coerce')
+        if converted.notna().all():
+            df[col] = converted
+    return df
 
 def detect_dashboard_keywords(text):
     """Detect if response contains dashboard-related keywords"""
@@ -209,78 +241,124 @@ def create_dashboard(df):
     
     return charts
 
+# Same reply text, same figures: reruns reuse them instead of rebuilding.
+# cache_resource hands back the cached objects, which are only read.
+@st.cache_resource(max_entries=DASHBOARD_CACHE_ENTRIES, show_spinner=False)
+def get_dashboard_charts(text):
+    """Return the dashboard charts for a reply, or None without table data"""
+    return create_dashboard(parse_markdown_table(text))
+
+def extract_text(uploaded_file, data):
+    """Return the plain text of an uploaded PDF or text file"""
+    if uploaded_file.type == "application/pdf":
+        reader = PdfReader(io.BytesIO(data))
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+    return data.decode("utf-8")
+
 def process_documents(uploaded_files):
-    """Process uploaded documents and create vector store"""
-    documents = []
+    """Add uploaded documents to the shared vector store.
+
+    Documents are keyed by a hash of their bytes, so a file that is already
+    indexed (by this or any other session) is skipped without embedding.
+    Returns the number of newly indexed documents.
+    """
+    store = get_vector_store()
+    text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+    pending = []
     
     for uploaded_file in uploaded_files:
-        if uploaded_file.type == "application/pdf":
-            loader = PyPDFLoader(uploaded_file)
-            documents.extend(loader.load())
-        elif uploaded_file.type == "text/plain":
-            text = uploaded_file.read().decode("utf-8")
-            documents.append(Document(page_content=text, metadata={"source": uploaded_file.name}))
-    
-    if documents:
-        text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-        texts = text_splitter.split_documents(documents)
-        
-        embeddings = OpenAIEmbeddings()
-        vectorstore = FAISS.from_documents(texts, embeddings)
-        
-        memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
-        rag_chain = ConversationalRetrievalChain.from_llm(
-            llm=OpenAI(temperature=0.7),
-            retriever=vectorstore.as_retriever(),
-            memory=memory
-        )
+        data = uploaded_file.getvalue()
+        doc_hash = document_hash(data)
+        if doc_hash in store:
+            continue
         
-        return vectorstore, rag_chain
+        chunks = text_splitter.split_text(extract_text(uploaded_file, data))
+        if chunks:
+            pending.append((doc_hash, chunks, uploaded_file.name))
+    
+    if not pending:
+        return 0
+    
+    # One pipeline call for every new chunk: shared chunks are embedded once,
+    # cached ones not at all, and the rest go out in concurrent batches
+    vectors = get_embeddings().embed([chunk for _, chunks, _ in pending for chunk in chunks])
+    added = 0
+    offset = 0
+    for doc_hash, chunks, name in pending:
+        if store.add(doc_hash, chunks, vectors[offset:offset + len(chunks)], {"source": name}):
+            added += 1
+        offset += len(chunks)
     
-    return None, None
+    return added
+
+# One stateless chain per process; each session passes its own recent turns
+@st.cache_resource
+def get_rag_chain():
+    return ConversationalRetrievalChain.from_llm(
+        llm=OpenAI(temperature=0.7),
+        retriever=StoreRetriever(),
+    )
+
+def chat_history_pairs():
+    """(question, answer) pairs for the turns still in this session's window"""
+    return [(turn["user"], turn["assistant"]) for turn in transcript.turns]
 
 def get_bot_response(user_message, model="gpt-3.5-turbo", temperature=0.7, use_rag=False):
     time.sleep(0.5)
     
+    engine = get_engine()
+
     # First try to find a matching intent
-    for intent in st.session_state['intents']['intents']:
-        if any(pattern.lower() in user_message.lower() for pattern in intent['patterns']):
-            return f"[RESPONSE PROTOCOL ACTIVATED] >> {random.choice(intent['responses'])}"
+    response = engine.match_intent(user_message)
+    if response is not None:
+        engine.remember(transcript.session_id, user_message, response)
+        return f"[RESPONSE PROTOCOL ACTIVATED] >> {response}"
 
     # Use RAG if available and enabled
-    if use_rag and st.session_state.rag_chain:
+    if use_rag and len(get_vector_store()) > 0:
         try:
-            response = st.session_state.rag_chain({"question": user_message})
+            response = get_rag_chain()({"question": user_message, "chat_history": chat_history_pairs()})
+            engine.remember(transcript.session_id, user_message, response["answer"])
             return response["answer"]
         except Exception as e:
             st.warning(f"RAG processing failed: {e}")
     
-    # Use OpenAI API
+    # Otherwise answer locally when the knowledge base has a confident match
+    answer = engine.lookup_knowledge(user_message)
+    if answer is not None:
+        engine.remember(transcript.session_id, user_message, answer)
+        return f"[KNOWLEDGE BASE] >> {answer}"
+
+    # Ask the LLM with this session's compacted history through the shared pooled client
     try:
-        response = openai.ChatCompletion.create(
-            model=model,
-            temperature=temperature,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """You are VILLIE, an advanced AI robot assistant with data analysis capabilities. You should:
-                    1. Always start responses with a system-like prefix like [PROCESSING], [ANALYZING], or [RESPONDING]
-                    2. Use technical, robotic language but remain helpful and friendly
-                    3. Occasionally include robot-like emojis (🤖, ⚡, 🔋, 💫)
-                    4. Include status updates or processing indicators
-                    5. When providing data or statistics, format them as markdown tables when appropriate
-                    6. End responses with a clear indication that you're ready for the next input
-                    
-                    If the user asks for data analysis, charts, or visualizations, provide the data in markdown table format so the dashboard can automatically generate charts."""
-                },
-                {"role": "user", "content": user_message}
-            ]
+        return engine.chat(
+            user_message, transcript.session_id, SYSTEM_PROMPT,
+            model=model, temperature=temperature,
         )
-        return response.choices[0].message.content
     except Exception as e:
         st.error(f"Error: {str(e)}")
         return "I apologize, but I'm having trouble processing your request. Please try again later."
 
+def render_message(message):
+    """Render one chat message as styled HTML"""
+    if message['role'] == 'user':
+        message_html = f"""
+            <div class='message-container'>
+                <div class='user-message'>
+                    <span style='color: #888;'>[USER]:</span> {message['content']}
+                </div>
+            </div>
+        """
+    else:
+        message_html = f"""
+            <div class='message-container'>
+                <div class='bot-message'>
+                    <span style='color: #00ff00;'>[VILLIE]:</span> {message['content']}
+                </div>
+            </div>
+        """
+    st.markdown(message_html, unsafe_allow_html=True)
+
 # Sidebar configuration
 with st.sidebar:
     st.markdown("""
@@ -307,24 +385,37 @@ with st.sidebar:
     
     if uploaded_files and st.button("Process Documents"):
         with st.spinner("Processing documents..."):
-            vectorstore, rag_chain = process_documents(uploaded_files)
-            if vectorstore:
-                st.session_state.vectorstore = vectorstore
-                st.session_state.rag_chain = rag_chain
-                st.success("Documents processed successfully!")
+            added = process_documents(uploaded_files)
+            if added:
+                st.success(f"Indexed {added} new document(s)!")
+            else:
+                st.info("All documents were already indexed.")
+    
+    # Documents in the shared knowledge base, available to every session
+    vector_store = get_vector_store()
+    if len(vector_store):
+        st.caption(f"Knowledge base: {len(vector_store)} document(s)")
+        for document in vector_store.documents():
+            col_name, col_remove = st.columns([4, 1])
+            col_name.write(document["metadata"].get("source", document["hash"][:12]))
+            if col_remove.button("✕", key=f"remove_{document['hash']}"):
+                vector_store.remove(document["hash"])
+                st.rerun()
     
     # Dashboard toggle
     dashboard_enabled = st.checkbox("Enable Auto-Dashboard", value=True)
     
     # Clear buttons
     if st.button("⚡ RESET SYSTEM"):
-        st.session_state.messages = []
-        st.session_state.dashboard_data = None
+        get_engine().forget(transcript.session_id)
+        transcript.clear()
+        st.session_state.dashboard_source = None
         st.session_state.show_dashboard = False
         st.rerun()
     
     if st.button("Clear Chat"):
-        st.session_state.messages = []
+        get_engine().forget(transcript.session_id)
+        transcript.clear()
         st.rerun()
 
 # Main content
@@ -346,29 +437,21 @@ with col1:
         </div>
     """, unsafe_allow_html=True)
 
+    # Older turns are loaded from the database one page at a time, on request
+    if transcript.offloaded:
+        with st.expander(f"Earlier messages ({transcript.offloaded} older turns)"):
+            for message in transcript.earlier_messages():
+                render_message(message)
+            if not transcript.earlier or transcript.has_more_earlier:
+                if st.button("Load earlier messages", key="load_earlier"):
+                    transcript.load_earlier()
+                    st.rerun()
+
     # Chat messages
     chat_container = st.container()
     with chat_container:
-        for message in st.session_state.messages:
-            is_user = message['role'] == 'user'
-            
-            if is_user:
-                message_html = f"""
-                    <div class='message-container'>
-                        <div class='user-message'>
-                            <span style='color: #888;'>[USER]:</span> {message['content']}
-                        </div>
-                    </div>
-                """
-            else:
-                message_html = f"""
-                    <div class='message-container'>
-                        <div class='bot-message'>
-                            <span style='color: #00ff00;'>[VILLIE]:</span> {message['content']}
-                        </div>
-                    </div>
-                """
-            st.markdown(message_html, unsafe_allow_html=True)
+        for message in transcript.messages():
+            render_message(message)
 
     # Chat input
     with st.container():
@@ -392,30 +475,19 @@ with col1:
             # Update system status
             st.session_state.system_status['processing'] = 'ACTIVE'
             
-            # Add user message
-            st.session_state.messages.append({
-                "role": "user",
-                "content": current_message,
-                "timestamp": datetime.now().strftime("%Y%m%d%H%M%S")
-            })
-            
             # Get bot response
             with st.spinner("🤖 PROCESSING..."):
-                use_rag = st.session_state.vectorstore is not None
+                use_rag = len(get_vector_store()) > 0
                 bot_response = get_bot_response(current_message, model, temperature, use_rag)
             
-            # Add bot response
-            st.session_state.messages.append({
-                "role": "assistant",
-                "content": bot_response,
-                "timestamp": datetime.now().strftime("%Y%m%d%H%M%S")
-            })
+            # Record the turn; it is persisted and rendered on the rerun
+            transcript.add_turn(current_message, bot_response)
             
             # Check for dashboard generation
             if dashboard_enabled:
                 df = parse_markdown_table(bot_response)
                 if df is not None or detect_dashboard_keywords(bot_response):
-                    st.session_state.dashboard_data = df
+                    st.session_state.dashboard_source = bot_response if df is not None else None
                     st.session_state.show_dashboard = True
             
             # Reset system status
@@ -423,11 +495,11 @@ with col1:
             st.rerun()
 
 with col2:
-    if st.session_state.show_dashboard and st.session_state.dashboard_data is not None:
+    if st.session_state.show_dashboard and st.session_state.dashboard_source is not None:
         st.markdown("<div class='dashboard-container'>", unsafe_allow_html=True)
         st.markdown("### 📊 Auto-Generated Dashboard")
         
-        charts = create_dashboard(st.session_state.dashboard_data)
+        charts = get_dashboard_charts(st.session_state.dashboard_source)
         if charts:
             for i, chart in enumerate(charts):
                 st.plotly_chart(chart, use_container_width=True, key=f"chart_{i}")